@@ -0,0 +1,45 @@
+import pygame as pg
+import threading
+from collections import OrderedDict
+
+MAXSIZE = 512  # max number of surfaces kept around, least recently used ones get dropped first
+QUANTUM = 4  # resized sprites bigger than 8 * QUANTUM pixels get snapped down to multiples of this
+
+_cache: OrderedDict = OrderedDict()
+_lock = threading.RLock()  # levels can be built from a background thread
+
+
+def get(path, size=None, flipped=False):
+    """Returns the image at path scaled to size (and mirrored if flipped), every file is decoded once
+    and every scaled/flipped variant is built once, then shared between all the objects using it"""
+    if size is not None:
+        size = (int(size[0]), int(size[1]))
+    key = (path, size, flipped)
+    with _lock:
+        surf = _cache.get(key)
+        if surf is not None:
+            _cache.move_to_end(key)
+            return surf
+
+        if flipped:
+            surf = pg.transform.flip(get(path, size), True, False)
+        elif size is not None:
+            surf = pg.transform.scale(get(path), size)
+        else:
+            surf = pg.image.load(path)
+
+        _cache[key] = surf
+        if len(_cache) > MAXSIZE:
+            _cache.popitem(last=False)
+        return surf
+
+
+def quantize(size, step=QUANTUM):
+    """Snaps a sprite size to whole pixels, and big sizes to multiples of step, so things that change size
+    a little every frame keep landing on the same cached surfaces"""
+    return tuple(int(s) if s < step * 8 else int(s) // step * step for s in size)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,231 @@
+"""Benchmarks for the simulation and the renderer, run headlessly
+
+    python bench.py fish                      # object fish vs the numpy swarm at 10/100/1000/10000 fish
+    python bench.py fish --counts 50 500 -s 2
+    python bench.py suite                     # every synthetic scenario, update and render timed separately
+    python bench.py suite walls_1000 shrink_ray -f 300 --json before.json
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+import pygame as pg
+from levels import (Level, Character, Wall, SmallFish, BigFish, VeryBigFish, Button, Gun,
+                    PLAYERVALS, PLAYERVALS2, FISHVALS, VERYBIGFISHVALS, GUNVALS, TICK)
+from inputs import InputFrame, NOINPUT
+
+# name: arguments for synthetic_level
+SCENARIOS = {
+    "empty": {},
+    "walls_100": {"walls": 100},
+    "walls_1000": {"walls": 1000},
+    "fish_100": {"fish": 100},
+    "fish_1000": {"fish": 1000},
+    "screen_1080p": {"walls": 50, "fish": 50, "size": (1920, 1080)},
+    "shrink_ray": {"fish": 100, "shrink": True},
+    "everything": {"walls": 300, "fish": 300, "size": (1920, 1080), "shrink": True},
+}
+
+
+def fish_level(n, seed=0):
+    """A big walled tank with n fish in it (mostly small ones, some big and a few very big),
+    the player stands on a ledge above the water so it stays out of the way"""
+    rng = random.Random(seed)
+    size = max(500, int(math.sqrt(n) * 60))
+    walls = [Wall((0, 0), 1, size), Wall((size - 1, 0), 1, size),
+             Wall((0, size - 1), size, 1), Wall((0, 60), 120, 20)]
+    fishes = [random_fish(rng, rng.uniform(10, size - 130), rng.uniform(120, size - 130)) for i in range(n)]
+    return Level(f"bench_fish_{n}", Character((10, 10), 20, 20, PLAYERVALS), walls, fishes, size, size, 100)
+
+
+def random_fish(rng, x, y):
+    kind = rng.random()
+    if kind < 0.05:
+        return VeryBigFish((x, y), 120, 90, (130, 50, 0), "verybigfish.png", values=VERYBIGFISHVALS,
+                           fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png")
+    if kind < 0.25:
+        return BigFish((x, y), 40, 40, (150, 155, 0), "bigfish.png", values=FISHVALS, speed=1,
+                       rushsprite="bigfish_rush.png")
+    return SmallFish((x, y), 12, 12, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5)
+
+
+def synthetic_level(walls=0, fish=0, size=None, shrink=False, seed=0):
+    """A tank with walls little walls and fish fish scattered around the water, an unpressed button
+    of every kind and a gun out of reach, the player stands on a ledge above the water
+    with shrink the player starts with the gun (the benchmark then keeps shooting at the middle of the tank)"""
+    rng = random.Random(seed)
+    if size is None:
+        side = max(500, int(math.sqrt(walls + fish) * 60))
+        size = (side, side)
+    w, h = size
+    walllist = [Wall((0, 0), 1, h), Wall((w - 1, 0), 1, h), Wall((0, h - 1), w, 1), Wall((0, 60), 120, 20)]
+    for i in range(walls):
+        walllist.append(Wall((rng.uniform(130, w - 40), rng.uniform(120, h - 40)),
+                             rng.randint(5, 30), rng.randint(5, 30), (50, 50, 50)))
+    objects = [random_fish(rng, rng.uniform(130, w - 130), rng.uniform(120, h - 130)) for i in range(fish)]
+    objects += [Button((w - 30, 5), 15, 15, (240, 240, 240), None, "lowerwater", newlevel=h - 50),
+                Button((w - 60, 5), 15, 15, (20, 20, 240), None, "raisewater", newlevel=50),
+                Button((w - 90, 5), 15, 15, (60, 0, 60), None, "removewall", wallind="last"),
+                Gun((w - 130, 5), 30, 30, (100, 100, 100), "gun.png", values=GUNVALS)]
+    player = Character((10, 10), 20, 20, PLAYERVALS2 if shrink else PLAYERVALS)
+    name = f"bench_{walls}walls_{fish}fish_{w}x{h}" + ("_shrink" if shrink else "")
+    return Level(name, player, walllist, objects, w, h, 100)
+
+
+def time_updates(level, seconds, maxframes=100000):
+    """Steps level until seconds have passed (at least one frame), returns the average time per frame"""
+    frames = 0
+    start = time.perf_counter()
+    while frames < maxframes:
+        level.update(TICK, NOINPUT)
+        frames += 1
+        if time.perf_counter() - start > seconds:
+            break
+    return (time.perf_counter() - start) / frames, frames
+
+
+def bench_fish(counts=(10, 100, 1000, 10000), seconds=1.0):
+    results = []
+    for n in counts:
+        row = {"fish": n}
+        for engine in ("objects", "swarm"):
+            level = fish_level(n)
+            level.reset()
+            level.reseed(n)
+            if engine == "swarm":
+                level.use_swarm()
+            row[engine], row[engine + "_frames"] = time_updates(level, seconds)
+        results.append(row)
+        print(f"{n:>6} fish   objects {row['objects'] * 1000:9.3f} ms/frame ({row['objects_frames']} frames)   "
+              f"swarm {row['swarm'] * 1000:9.3f} ms/frame ({row['swarm_frames']} frames)   "
+              f"x{row['objects'] / row['swarm']:.1f}")
+    return results
+
+
+def percentile(times, p):
+    times = sorted(times)
+    return times[min(len(times) - 1, int(len(times) * p / 100))]
+
+
+def stats(times):
+    total = sum(times)
+    return {"fps": len(times) / total if total else math.inf, "mean_ms": total / len(times) * 1000,
+            "p50_ms": percentile(times, 50) * 1000, "p99_ms": percentile(times, 99) * 1000}
+
+
+def bench_scenario(name, frames=600, render=True, dirty=True, allocframes=60, seed=0):
+    """Steps (and draws) a synthetic level for frames frames, timing update and render separately,
+    then runs allocframes more under tracemalloc to see how much memory a frame churns through"""
+    level = synthetic_level(seed=seed, **SCENARIOS[name])
+    level.reset()
+    level.reseed(seed)
+    center = (level.screenwidth / 2, level.screenheight / 2)
+    frame = InputFrame(shoot=True, mousepos=center) if level.player.gun else NOINPUT
+    game = None
+    if render:
+        import jam
+        game = jam.Game(levels=[level], prefetch=False, dirty=dirty)
+        game.level = 0
+        game.screen = pg.display.set_mode((level.screenwidth, level.screenheight))
+
+    update, draw = [], []
+    for i in range(frames):
+        start = time.perf_counter()
+        level.update(TICK, frame)
+        update.append(time.perf_counter() - start)
+        if game is not None:
+            start = time.perf_counter()
+            game.render()
+            draw.append(time.perf_counter() - start)
+
+    # peak memory above what was already allocated, per frame, is roughly what the frame allocated
+    allocs = {"update": [], "render": []}
+    tracemalloc.start()
+    for i in range(allocframes):
+        for phase in ("update", "render") if game is not None else ("update",):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            if phase == "update":
+                level.update(TICK, frame)
+            else:
+                game.render()
+            allocs[phase].append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    result = {"scenario": name, **SCENARIOS[name], "frames": frames,
+              "objects": len(level.objects), "alive_fish": sum(getattr(o, "alive", False) for o in level.objects),
+              "update": stats(update)}
+    if draw:
+        result["render"] = stats(draw)
+        result["frame"] = stats([u + d for u, d in zip(update, draw)])
+    for phase, sizes in allocs.items():
+        if sizes:
+            result[phase]["alloc_kb"] = sum(sizes) / len(sizes) / 1024
+    return result
+
+
+def bench_suite(names=None, frames=600, render=True, dirty=True):
+    results = []
+    print(f"{'scenario':<14} {'update fps':>10} {'p50':>8} {'p99':>8} {'KB':>7}   "
+          f"{'render fps':>10} {'p50':>8} {'p99':>8} {'KB':>7}")
+    for name in names or SCENARIOS:
+        result = bench_scenario(name, frames, render, dirty)
+        results.append(result)
+        line = f"{name:<14}"
+        for phase in ("update", "render"):
+            if phase in result:
+                r = result[phase]
+                line += (f" {r['fps']:10.0f} {r['p50_ms']:7.3f}ms {r['p99_ms']:7.3f}ms {r['alloc_kb']:7.1f}"
+                         if phase == "update" else
+                         f"   {r['fps']:10.0f} {r['p50_ms']:7.3f}ms {r['p99_ms']:7.3f}ms {r['alloc_kb']:7.1f}")
+        print(line)
+    return results
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    fish = sub.add_parser("fish", help="object fish vs the numpy swarm engine")
+    fish.add_argument("--counts", nargs="+", type=int, default=[10, 100, 1000, 10000])
+    fish.add_argument("-s", "--seconds", type=float, default=1.0, help="time spent on each engine and count")
+    suite = sub.add_parser("suite", help="synthetic levels scaled by walls, fish, screen size and shrink ray use")
+    suite.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}, all of them if none are given")
+    suite.add_argument("-f", "--frames", type=int, default=600)
+    suite.add_argument("--no-render", action="store_true", help="only time Level.update")
+    suite.add_argument("--full", action="store_true", help="redraw the whole screen every frame instead of dirty rects")
+    for p in (fish, suite):
+        p.add_argument("--json", metavar="PATH", help="also save the results here, to compare between commits")
+    args = parser.parse_args()
+
+    if args.bench == "fish":
+        results = bench_fish(args.counts, args.seconds)
+    else:
+        unknown = [name for name in args.scenarios if name not in SCENARIOS]
+        if unknown:
+            parser.error(f"unknown scenario {', '.join(unknown)}")
+        results = bench_suite(args.scenarios, args.frames, not args.no_render, not args.full)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"bench": args.bench, "commit": commit(), "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "python": platform.python_version(), "pygame": pg.version.ver, "results": results},
+                      file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Checks that changes to the engine didn't change how the game plays, run headlessly
+
+    python check.py                  # every check below
+    python check.py hashes grids     # some of them
+    python check.py hashes --update  # the game is meant to play differently now, save the new hashes
+
+hashes     every level played on scripted inputs ends up in the same state as it did when check.json was saved
+grids      the fish and wall grids give the same game as looking through every fish and wall
+swarm      the numpy fish engine plays like the object fish given the same random draws, to within TOLERANCE
+           (not bit for bit, numpy adds things up in a different order), needs numpy
+snapshots  restoring a snapshot and playing on is the same as playing on the first time, so is resetting
+replays    a recording plays back into the state it was recorded in
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import hashlib
+import json
+import random
+import tempfile
+import levels
+import replay
+from levels import TICK, Fish
+from inputs import InputFrame
+
+HASHES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "check.json")
+TICKS = 1200  # ticks every level is played for
+HOLD = 12  # ticks every scripted input is held for
+TOLERANCE = 1e-6  # how far the swarm's fish can be from the object fish, in pixels
+
+
+def script(level, levelindex, ticks=TICKS):
+    """The same made up inputs for a level every time: random keys held for HOLD ticks,
+    shooting at random spots now and then (it only does something once the player has the gun)"""
+    rng = random.Random(levelindex)
+    frames = []
+    while len(frames) < ticks:
+        shoot = rng.random() < 0.3
+        frame = InputFrame(left=rng.random() < 0.3, right=rng.random() < 0.6, up=rng.random() < 0.4,
+                           down=rng.random() < 0.2, shoot=shoot,
+                           mousepos=(rng.randrange(level.screenwidth), rng.randrange(level.screenheight)))
+        jump = InputFrame(**{**vars(frame), "jump": True}) if rng.random() < 0.3 else frame
+        frames += [jump] + [frame] * (HOLD - 1)
+    return frames[:ticks]
+
+
+def play(level, frames):
+    """Digest of the level after every tick"""
+    digests = []
+    for frame in frames:
+        level.update(TICK, frame)
+        digests.append(replay.digest(level))
+    return digests
+
+
+def fresh(i):
+    """A level built just now, so it picks up GRIDMIN and WALLGRIDMIN as they are"""
+    return levels.levellist.factories[i]()
+
+
+def check_hashes(update=False):
+    hashes = {}
+    for i in range(len(levels.levellist)):
+        level = fresh(i)
+        hashes[str(level.levelid)] = hashlib.md5(b"".join(play(level, script(level, i)))).hexdigest()
+    if update:
+        with open(HASHES, "w") as file:
+            json.dump(hashes, file, indent=2)
+        print(f"saved the hashes of {len(hashes)} levels to {HASHES}")
+        return []
+    with open(HASHES) as file:
+        saved = json.load(file)
+    return [f"{levelid} plays differently" for levelid, digest in hashes.items() if saved.get(levelid) != digest] + \
+           [f"{levelid} is gone" for levelid in saved if levelid not in hashes]
+
+
+def check_grids():
+    failures = []
+    gridmin, wallgridmin = levels.GRIDMIN, levels.WALLGRIDMIN
+    try:
+        for i in range(len(levels.levellist)):
+            runs = []
+            for levels.GRIDMIN, levels.WALLGRIDMIN in ((0, 0), (1 << 30, 1 << 30)):  # always a grid, never a grid
+                level = fresh(i)
+                runs.append(play(level, script(level, i)))
+            if runs[0] != runs[1]:
+                tick = next(t for t, (a, b) in enumerate(zip(*runs)) if a != b)
+                failures.append(f"{level.levelid}: the grids change the game at tick {tick}")
+    finally:
+        levels.GRIDMIN, levels.WALLGRIDMIN = gridmin, wallgridmin
+    return failures
+
+
+class Draws(random.Random):
+    """The same stream of random numbers for both engines, the object fish take them one at a time
+    and the swarm an array at a time, in the same fish order"""
+    def random(self, shape=None):
+        if shape is None:
+            return super().random()
+        import numpy as np
+        count = int(np.prod(shape))
+        return np.array([super(Draws, self).random() for _ in range(count)]).reshape(shape)
+
+
+def fishstate(level):
+    return [(fish.alive, fish.topleft.x, fish.topleft.y, fish.width, fish.height)
+            for fish in level.objects if isinstance(fish, Fish)]
+
+
+def check_swarm():
+    import swarm
+    if swarm.np is None:
+        return ["numpy isn't installed, the swarm wasn't checked"]
+    failures = []
+    for i in range(len(levels.levellist)):
+        states = []
+        for engine in ("objects", "swarm"):
+            level = fresh(i)
+            level.rng = Draws(i)
+            if engine == "swarm":
+                level.use_swarm()
+                level.swarm.rng = Draws(i)
+            frames = script(level, i)
+            states.append([])
+            for frame in frames:
+                level.update(TICK, frame)
+                states[-1].append((fishstate(level), tuple(level.player.topleft)))
+        for tick, (a, b) in enumerate(zip(*states)):
+            (fa, pa), (fb, pb) = a, b
+            if len(fa) != len(fb) or any(x[0] != y[0] for x, y in zip(fa, fb)):
+                failures.append(f"{level.levelid}: different fish alive at tick {tick}")
+                break
+            worst = max([abs(u - v) for x, y in zip(fa + [(True, *pa)], fb + [(True, *pb)])
+                         for u, v in zip(x[1:], y[1:])], default=0)
+            if worst > TOLERANCE:
+                failures.append(f"{level.levelid}: off by {worst:.3g} pixels at tick {tick}")
+                break
+    return failures
+
+
+def check_snapshots():
+    failures = []
+    for i in range(len(levels.levellist)):
+        level = fresh(i)
+        frames = script(level, i)
+        half = len(frames) // 2
+        first = play(level, frames[:half])
+        snapshot = level.snapshot()
+        second = play(level, frames[half:])
+        level.restore(snapshot)
+        if play(level, frames[half:]) != second:
+            failures.append(f"{level.levelid}: playing on from a restored snapshot goes differently")
+        level.reset()
+        if play(level, frames[:half]) != first:
+            failures.append(f"{level.levelid}: playing from a reset goes differently than from a fresh level")
+    return failures
+
+
+def check_replays():
+    failures = []
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(len(levels.levellist)):
+            level = levels.levellist[i]
+            level.reset()
+            path = os.path.join(folder, f"{i}.sfr")
+            recorder = replay.Recorder(path, i, level, seed=i)
+            for frame in script(level, i):
+                recorder.write(TICK, frame)
+                level.update(TICK, frame)
+            recorder.close(level)
+            recording = replay.load(path)
+            if replay.digest(replay.play(recording)) != recording.digest:
+                failures.append(f"{level.levelid}: the replay doesn't end where the recording did")
+            levels.levellist.release(i)
+    return failures
+
+
+CHECKS = {"hashes": check_hashes, "grids": check_grids, "swarm": check_swarm,
+          "snapshots": check_snapshots, "replays": check_replays}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the engine still plays the game the same way")
+    parser.add_argument("checks", nargs="*", help=f"any of {', '.join(CHECKS)}, all of them if none are given")
+    parser.add_argument("--update", action="store_true", help="save new level hashes instead of checking them")
+    args = parser.parse_args()
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check {', '.join(unknown)}")
+
+    failed = 0
+    for name in args.checks or CHECKS:
+        failures = check_hashes(args.update) if name == "hashes" else CHECKS[name]()
+        print(f"{name:<10} {'ok' if not failures else 'FAILED'}")
+        for failure in failures:
+            print(f"    {failure}")
+        failed += bool(failures)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Runs levels without a window or a keyboard/mouse, as fast as the machine allows
+
+    python headless.py              # every level
+    python headless.py 7 9 -f 60000 # levels 7 and 9, 60000 frames each
+    python headless.py 8 -p 8.csv   # and save how long every phase of every tick took (.json for a chrome trace)
+    python headless.py --pack mypack.json
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import time
+import levels
+import levelfile
+import profiler
+from inputs import InputFrame, NOINPUT
+
+TICK = 1 / levels.FPS
+
+
+def simulate(level, frames, inputs=None, dt=TICK, stop=True):
+    """Steps level for up to frames ticks, returns the number of ticks stepped
+    inputs can be None (nothing pressed), one InputFrame used for every tick,
+    a list of InputFrames (one per tick, nothing pressed once it runs out) or a function f(level, tick) -> InputFrame
+    if stop is True it stops as soon as the level is cleared or the player dies"""
+    for i in range(frames):
+        if inputs is None:
+            frame = NOINPUT
+        elif isinstance(inputs, InputFrame):
+            frame = inputs
+        elif callable(inputs):
+            frame = inputs(level, i)
+        else:
+            frame = inputs[i] if i < len(inputs) else NOINPUT
+        level.update(dt, frame)
+        if profiler.active:
+            profiler.active.frame()
+        if stop and (level.cleared or not level.player.alive):
+            return i + 1
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step levels headlessly and report the simulation speed")
+    parser.add_argument("levels", nargs="*", type=int, help="level indexes, all of them if none are given")
+    parser.add_argument("-f", "--frames", type=int, default=10000)
+    parser.add_argument("-p", "--profile", metavar="PATH", help="save per phase timings of the last level run here")
+    parser.add_argument("--pack", metavar="PATH", help="run the levels of a level pack (see levelfile.py)")
+    args = parser.parse_args()
+    levellist = levelfile.load(args.pack) if args.pack else levels.levellist
+
+    for i in args.levels or range(len(levellist)):
+        level = levellist[i]
+        level.reset()
+        if args.profile:
+            profiler.enable(args.frames)
+        start = time.perf_counter()
+        frames = simulate(level, args.frames, stop=False)
+        took = time.perf_counter() - start
+        print(f"{level.levelid:<22} {frames} frames in {took:.3f}s  ({frames / took:.0f} frames/s)")
+        levellist.release(i)
+    if args.profile:
+        profiler.active.save(args.profile)
+
+
+if __name__ == "__main__":
+    main()
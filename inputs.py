@@ -0,0 +1,47 @@
+import pygame as pg
+from pygame.locals import *
+
+
+class InputFrame:
+    """Everything the player character reads from the controls in one frame
+    Character.inputs only looks at one of these, so a level can be driven by a script or a recording
+    instead of the keyboard and mouse"""
+    def __init__(self, left=False, right=False, up=False, down=False, jump=False,
+                 shoot=False, mousepos=(0, 0), quit=False):
+        self.left = left  # A held
+        self.right = right  # D held
+        self.up = up  # W or space held (swimming up)
+        self.down = down  # S held
+        self.jump = jump  # space pressed this frame
+        self.shoot = shoot  # left mouse button held
+        self.mousepos = mousepos
+        self.quit = quit  # window closed or escape pressed
+
+    def __repr__(self):
+        return (f"InputFrame(left={self.left}, right={self.right}, up={self.up}, down={self.down}, "
+                f"jump={self.jump}, shoot={self.shoot}, mousepos={self.mousepos})")
+
+
+NOINPUT = InputFrame()
+
+
+def poll():
+    """Reads the current state of the keyboard and mouse from pygame"""
+    frame = InputFrame()
+    for event in pg.event.get():
+        if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+            frame.quit = True
+        # single click inputs, continuous inputs are handled below
+        elif event.type == KEYDOWN and event.key == K_SPACE:
+            frame.jump = True
+
+    keys = pg.key.get_pressed()
+    frame.left = bool(keys[K_a])
+    frame.right = bool(keys[K_d])
+    frame.up = bool(keys[K_w] or keys[K_SPACE])
+    frame.down = bool(keys[K_s])
+
+    frame.shoot = bool(pg.mouse.get_pressed()[0])
+    if frame.shoot:
+        frame.mousepos = pg.mouse.get_pos()
+    return frame
@@ -1,95 +1,246 @@
 import pygame as pg
+import argparse
+import os
+import sys
 import time
-from levels import levellist, Fish, Gun, Button
+from levels import levellist, Fish, Gun, Button, FPS
+from inputs import poll
+import assets
+import levelfile
+import profiler
+import replay
 
 pg.init()
 LEVELLIST = levellist
 FONT = pg.font.SysFont("comicsans", 15)
+HUDCORNERS = ("topright", "topleft", "bottomright", "bottomleft")  # where the profiler overlay can go
+
+
+class FixedStep:
+    """Runs Level.update in fixed size ticks no matter how fast frames are rendered,
+    leftover time is carried over to the next frame and alpha says how far between two ticks the frame is"""
+    def __init__(self, tickrate=FPS, maxframe=0.25):
+        self.tick = 1 / tickrate
+        self.maxframe = maxframe  # a frame longer than this (window dragged, breakpoint...) is cut short
+        self.accumulator = 0
+        self.jump = False
+        self.recorder = None  # replay.Recorder that gets every tick's input, if the level is being recorded
+
+    def advance(self, level, dt, frame):
+        """Steps level by as many ticks as fit in dt, returns how many ran"""
+        self.accumulator += min(dt, self.maxframe)
+        # a jump press has to reach a tick even if this frame was too short to run one
+        self.jump = self.jump or frame.jump
+        ticks = 0
+        while self.accumulator >= self.tick and not level.cleared and level.player.alive:
+            frame.jump = self.jump
+            if self.recorder is not None:
+                self.recorder.write(self.tick, frame)
+            level.update(self.tick, frame)
+            self.jump = False
+            self.accumulator -= self.tick
+            ticks += 1
+        return ticks
+
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.tick, 1)
+
+    def reset(self):
+        self.accumulator = 0
+        self.jump = False
 
 
 class Game:
-    def __init__(self, levels=LEVELLIST, fps=60):
+    def __init__(self, levels=LEVELLIST, fps=60, prefetch=True, tickrate=FPS, interpolate=True, dirty=True,
+                 record=None, hudcorner="topright"):
 
         self.screen = None
 
         self.clock = pg.time.Clock()
-        self.fps = fps
+        self.fps = fps  # frames drawn per second, 0 for uncapped
+        self.step = FixedStep(tickrate)  # the simulation always runs at tickrate, whatever fps is
+        self.interpolate = interpolate  # draw moving things in between ticks instead of snapping to the last one
+        self.dirty = dirty  # only push the parts of the screen that changed to the display
+        self.drawn = []  # screen areas of everything that moves, from the last frame
+        self.scene = None  # the screen and level background the last frame was drawn with
 
+        self.record = record  # folder to save a replay of every level attempt in
         self.levels = levels
         self.level = 0  # current level index
+        self.prefetch = prefetch  # build the next level in the background while this one is played
+        self.hudcorner = hudcorner  # one of HUDCORNERS, level titles are top left and floors are at the bottom
 
-    def render(self):
-        self.screen.fill((255, 255, 255))
-        w, h = self.screen.get_size()
-        pg.draw.rect(self.screen, (0, 0, 180),
-                     (0, self.levels[self.level].waterlevel, w, h - self.levels[self.level].waterlevel))
-        for wall in self.levels[self.level].walls:
-            pg.draw.rect(self.screen, wall.color, wall.pg_rect)
-        for obj in self.levels[self.level].objects:
+    def pos(self, obj, alpha):
+        if not self.interpolate or alpha >= 1:
+            return obj.topleft
+        return obj.prevtopleft.lerp(obj.topleft, alpha)
+
+    def render(self, alpha=1):
+        level = self.levels[self.level]
+        prof = profiler.active
+        if prof: prof.mark("render background")
+        background = level.background(self.screen.get_size())
+        if self.dirty and self.scene == (self.screen, background):
+            # only wipe what was drawn on top of the background last frame
+            for rect in self.drawn:
+                self.screen.blit(background, rect, rect)
+        else:
+            self.screen.blit(background, (0, 0))
+        drawn = []  # where everything that can move or disappear ended up this frame
+        if prof: prof.mark("render objects")
+        for obj in level.live:
             
-            if isinstance(obj, Button) and not obj.pressed:
-                pg.draw.rect(self.screen, obj.color, obj.pg_rect)
+            if isinstance(obj, Button):
+                drawn.append(pg.draw.rect(self.screen, obj.color, obj.pg_rect))
                 
-            elif isinstance(obj, Fish) and obj.alive:
+            elif isinstance(obj, Fish):
                 if obj.sprite is not None:
                     if obj.v.x < -0.5:
                         obj.sprite = obj.flippedsprites[obj.spriteindex]
                     elif obj.v.x > 0.5:
                         obj.sprite = obj.sprites[obj.spriteindex]
-                    self.screen.blit(obj.sprite, obj.topleft)
+                    drawn.append(self.screen.blit(obj.sprite, self.pos(obj, alpha)))
                 else:
-                    pg.draw.rect(self.screen, obj.color, obj.pg_rect)
+                    drawn.append(pg.draw.rect(self.screen, obj.color, obj.pg_rect))
 
                 
-            elif isinstance(obj, Gun) and not obj.picked:
+            elif isinstance(obj, Gun):
                 if obj.sprite is not None:
-                    self.screen.blit(obj.sprite, obj.topleft)
+                    drawn.append(self.screen.blit(obj.sprite, self.pos(obj, alpha)))
                 else:
-                    pg.draw.rect(self.screen, obj.color, obj.pg_rect)
+                    drawn.append(pg.draw.rect(self.screen, obj.color, obj.pg_rect))
 
-        if self.levels[self.level].player.image is not None:
-            if self.levels[self.level].player.v.x <= 0:
-                self.screen.blit(self.levels[self.level].player.flipped, self.levels[self.level].player.topleft)
+        if prof: prof.mark("render player")
+        playerpos = self.pos(level.player, alpha)
+        if level.player.image is not None:
+            if level.player.v.x <= 0:
+                drawn.append(self.screen.blit(level.player.flipped, playerpos))
             else:
-                self.screen.blit(self.levels[self.level].player.image, self.levels[self.level].player.topleft)
+                drawn.append(self.screen.blit(level.player.image, playerpos))
         else:
-            pg.draw.rect(self.screen, self.levels[self.level].player.color, self.levels[self.level].player.pg_rect)
+            drawn.append(pg.draw.rect(self.screen, level.player.color, level.player.pg_rect))
 
-        if self.levels[self.level].player.ray_start is not None:
-            pg.draw.line(self.screen, (255, 0, 0),
-                         self.levels[self.level].player.ray_start, self.levels[self.level].player.ray_end, width=10)
-        o2 = int(self.levels[self.level].player.oxygen // 100)
+        if level.player.ray_start is not None:
+            drawn.append(pg.draw.line(self.screen, (255, 0, 0),
+                                      level.player.ray_start, level.player.ray_end, width=10))
+        o2 = int(level.player.oxygen // 100)
         if o2 < 10:
-            oxygen = FONT.render(f"Oxygen: {int(self.levels[self.level].player.oxygen // 100)}", True, (255, 0, 0))
-            self.screen.blit(oxygen, (self.levels[self.level].player.topleft.x - 20, self.levels[self.level].player.topleft.y - 40))
-        if self.levels[self.level].text is not None:
-            self.screen.blit(self.levels[self.level].text, self.levels[self.level].textpos)
-        pg.display.flip()
-        pg.display.update()
+            oxygen = FONT.render(f"Oxygen: {int(level.player.oxygen // 100)}", True, (255, 0, 0))
+            drawn.append(self.screen.blit(oxygen, (playerpos.x - 20, playerpos.y - 40)))
+        if prof:
+            prof.mark("render profiler")
+            lines = [[FONT.render(line, True, (0, 0, 0), (255, 255, 255)) for line in pair] for pair in prof.lines()]
+            w, h = 125 + max(timings.get_width() for phase, timings in lines), 18 * len(lines)
+            x = 5 if self.hudcorner.endswith("left") else self.screen.get_width() - w - 5
+            y = 5 if self.hudcorner.startswith("top") else self.screen.get_height() - h - 5
+            for i, (phase, timings) in enumerate(lines):
+                drawn.append(self.screen.blit(phase, (x, y + 18 * i)))
+                drawn.append(self.screen.blit(timings, (x + 125, y + 18 * i)))
+            prof.mark("present")
+        self.present(background, drawn)
+        if prof: prof.end()
+
+    def present(self, background, drawn):
+        """Shows the frame, in dirty mode only the areas where something moved get sent to the display:
+        where things were last frame (to clear them) and where they are now"""
+        if not self.dirty:
+            pg.display.flip()
+            return
+        # a new background means a button was pressed or the level changed/reset
+        scene = (self.screen, background)
+        if scene != self.scene:
+            self.scene = scene
+            pg.display.flip()
+        else:
+            pg.display.update(self.drawn + drawn)
+        self.drawn = drawn
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Smaller Fish")
+    parser.add_argument("--record", metavar="FOLDER", help="save a replay of every level attempt in FOLDER")
+    parser.add_argument("--pack", metavar="PATH", help="play the levels of a level pack (see levelfile.py)")
+    parser.add_argument("--watch", action="store_true", help="reload levels from the pack whenever it's saved")
+    parser.add_argument("--profile", metavar="PATH", nargs="?", const="",
+                        help="show where the frame time goes, and save it to PATH (.json or .csv) when the game closes")
+    parser.add_argument("--profile-corner", choices=HUDCORNERS, default="topright",
+                        help="corner of the screen the --profile overlay is drawn in")
+    args = parser.parse_args()
+    if args.watch and not args.pack:
+        parser.error("--watch needs a --pack to watch")
+    if args.profile is not None:
+        profiler.enable()
+
     dt = 0
-    game = Game()
+    watcher = levelfile.Watcher(args.pack) if args.watch else None
+    if watcher is not None:
+        levellist = watcher.levels
+    else:
+        levellist = levelfile.load(args.pack) if args.pack else LEVELLIST
+    game = Game(levellist, record=args.record, hudcorner=args.profile_corner)
+    if game.record:
+        os.makedirs(game.record, exist_ok=True)
     while len(game.levels) > game.level:
-        game.screen = pg.display.set_mode((game.levels[game.level].screenwidth, game.levels[game.level].screenheight))
-        game.levels[game.level].reset()
-        while game.levels[game.level].cleared == False and game.levels[game.level].player.alive == True:
+        level = game.levels[game.level]
+        if game.prefetch:
+            game.levels.prefetch(game.level + 1)
+        game.screen = pg.display.set_mode((level.screenwidth, level.screenheight))
+        level.reset()
+        game.step.reset()
+        if game.record:
+            path = os.path.join(game.record, f"{level.levelid}_{time.strftime('%Y%m%d_%H%M%S')}.sfr")
+            game.step.recorder = replay.Recorder(path, game.level, level)
+        while level.cleared == False and level.player.alive == True:
+            frame = poll()
+            if frame.quit:
+                if game.step.recorder is not None:
+                    game.step.recorder.close(level)
+                if args.profile:
+                    profiler.active.save(args.profile)
+                pg.quit()
+                sys.exit()
+            if watcher is not None and game.level in watcher.poll():
+                try:
+                    new = game.levels[game.level]
+                except Exception as e:
+                    # the pack checked out but the level didn't build (a sprite went missing...), keep playing this one
+                    print(f"Not reloading {level.levelid}: {e!r}")
+                    watcher.keep(game.level, level)
+                    new = level
+                if new is not level:
+                    if game.step.recorder is not None:
+                        # the rest of the attempt is played on a different version of the level
+                        game.step.recorder.close(level)
+                        game.step.recorder = None
+                    old, level = level, new
+                    level.reset()
+                    levelfile.keep_player(old, level)
+                    if game.screen.get_size() != (level.screenwidth, level.screenheight):
+                        game.screen = pg.display.set_mode((level.screenwidth, level.screenheight))
+            game.step.advance(level, dt, frame)
+            game.render(game.step.alpha)
+            if profiler.active:
+                profiler.active.frame()
             # delta time
-            game.levels[game.level].update(dt)
-            game.render()
             dt = game.clock.tick(game.fps) / 1000
-        if game.levels[game.level].player.alive == False:
+        if game.step.recorder is not None:
+            game.step.recorder.close(level)
+            game.step.recorder = None
+        if level.player.alive == False:
             print("You died!")
         else:
             print("Level clear!")
+            game.levels.release(game.level)
             game.level += 1
-    win = pg.image.load("win.png")
+    win = assets.get("win.png")
     game.screen.blit(win, (0, 0))
     pg.display.flip()
     pg.display.update()
     time.sleep(1)
     print("You win!")
+    if args.profile:
+        profiler.active.save(args.profile)
     pg.quit()
 
 
@@ -0,0 +1,510 @@
+"""Levels as data, a level pack is a json file with any number of levels in it
+
+    python jam.py --pack mypack.json            # play the levels of a pack instead of the ones in levels.py
+    python levelfile.py export builtin.json     # write the levels in levels.py out as a pack, a good start for a new one
+    python levelfile.py check mypack.json       # validate a pack and list what's in it
+    python jam.py --pack mypack.json --watch    # and reload levels while playing whenever the file is saved
+
+A pack looks like this
+
+    {"format": 1, "levels": [
+      {"id": "3_onesmallfish", "size": [500, 500], "water": 100,
+       "text": "Level 4: Observe cute little fish!", "textpos": [0, 0],
+       "player": {"pos": [5, 5], "size": [40, 40], "values": "PLAYERVALS"},
+       "walls": [[0, 90, 65, 500], [435, 88, 65, 412, [0, 0, 0]]],
+       "objects": [
+        {"type": "smallfish", "pos": [240, 240], "size": [15, 15], "color": [0, 255, 0], "speed": 1.5}]}]}
+
+walls are [x, y, width, height] with an optional color, objects are in the order they're given
+(fish that come first get to eat first). The fields of every object type and their defaults are in TYPES
+values can be the name of one of the tables in levels.py (PLAYERVALS, FISHVALS...) or an object,
+whatever an object leaves out is taken from the default table for that field
+
+A pack only gets validated the first time it's loaded, the checked result goes in a __levelcache__ folder
+next to it under the hash of the file, so loading it again (unchanged) skips straight to building the levels,
+which only happens once each level is actually played
+"""
+import argparse
+import functools
+import hashlib
+import json
+import math
+import os
+import time
+import pygame as pg
+import levels
+from levels import Level, LevelList, Character, Wall, SmallFish, BigFish, VeryBigFish, Button, Gun
+
+FORMAT = 1
+# bump whenever check() or the defaults below change, cached packs were checked (and filled in) by the old ones
+CACHEVERSION = 4
+PRESETS = ("PLAYERVALS", "PLAYERVALS2", "FISHVALS", "VERYBIGFISHVALS", "GUNVALS")
+REQUIRED = object()  # default of the fields that have to be there
+
+LEVEL = {"id": REQUIRED, "size": (500, 500), "water": 100, "text": None, "textpos": (0, 0),
+         "player": REQUIRED, "walls": (), "objects": ()}
+PLAYER = {"pos": REQUIRED, "size": REQUIRED, "values": "PLAYERVALS", "color": (255, 0, 0), "image": "char.png"}
+# type: (class, fields and their defaults)
+TYPES = {
+    "smallfish": (SmallFish, {"pos": REQUIRED, "size": REQUIRED, "color": REQUIRED, "sprite": "smallfish.png",
+                              "values": "FISHVALS", "speed": REQUIRED}),
+    "bigfish": (BigFish, {"pos": REQUIRED, "size": REQUIRED, "color": REQUIRED, "sprite": "bigfish.png",
+                          "values": "FISHVALS", "speed": REQUIRED, "rushsprite": "bigfish_rush.png"}),
+    "verybigfish": (VeryBigFish, {"pos": REQUIRED, "size": REQUIRED, "color": REQUIRED, "sprite": "verybigfish.png",
+                                  "values": "VERYBIGFISHVALS", "fishvalues": "FISHVALS", "speed": REQUIRED,
+                                  "lungesprite": "verybigfish_lunge.png"}),
+    "button": (Button, {"pos": REQUIRED, "size": REQUIRED, "color": REQUIRED, "sprite": None,
+                        "button": REQUIRED, "newlevel": 0, "wallind": 0}),
+    "gun": (Gun, {"pos": REQUIRED, "size": REQUIRED, "color": REQUIRED, "sprite": "gun.png", "values": "GUNVALS"}),
+}
+BUTTONS = ("raisewater", "lowerwater", "removewall")
+FISH = ("smallfish", "bigfish", "verybigfish")  # these can't do without their sprite, the rest fall back on a rect
+
+
+class LevelFileError(ValueError):
+    pass
+
+
+def number(value, where):
+    """json allows NaN and Infinity, the game doesn't"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise LevelFileError(f"{where} should be a number, not {value!r}")
+    return value
+
+
+def pair(value, where):
+    if not isinstance(value, list) or len(value) != 2:
+        raise LevelFileError(f"{where} should be [x, y], not {value!r}")
+    return number(value[0], where), number(value[1], where)
+
+
+def size(value, where):
+    width, height = pair(value, where)
+    if width <= 0 or height <= 0:
+        raise LevelFileError(f"{where} should be [width, height] with both above 0, not {value!r}")
+    return width, height
+
+
+def color(value, where, invisible=False):
+    """objects can be "invis" but can't have an alpha, walls and the player are drawn straight with their color"""
+    if invisible and value == "invis":
+        return value
+    if not isinstance(value, list) or len(value) not in ((3,) if invisible else (3, 4)) or not all(
+            isinstance(c, int) and not isinstance(c, bool) and 0 <= c <= 255 for c in value):
+        raise LevelFileError(f"{where} should be [r, g, b] with 0-255 in each" +
+                             (' or "invis"' if invisible else "") + f", not {value!r}")
+    return tuple(value)
+
+
+def text(value, where, optional=False):
+    if optional and value is None:
+        return value
+    if not isinstance(value, str):
+        raise LevelFileError(f"{where} should be a string, not {value!r}")
+    return value
+
+
+def sprite(value, where):
+    """Sprite paths are relative to where the game runs from, like the ones in levels.py"""
+    if not os.path.isfile(text(value, where)):
+        raise LevelFileError(f"{where} is {value!r}, there's no such file")
+    return value
+
+
+def values(value, where, default):
+    """A preset name stays a name (it's looked up when the level gets built), an object only keeps the keys it sets"""
+    if isinstance(value, str):
+        if value not in PRESETS:
+            raise LevelFileError(f"{where} should be one of {', '.join(PRESETS)} or an object, not {value!r}")
+        return value
+    if not isinstance(value, dict):
+        raise LevelFileError(f"{where} should be a preset name or an object, not {value!r}")
+    known = getattr(levels, default)
+    for key, v in value.items():
+        if key not in known:
+            raise LevelFileError(f"{where} has {key!r}, which isn't one of {', '.join(known)}")
+        if key != "gun":
+            number(v, f"{where}.{key}")
+    return dict(value)
+
+
+def fields(data, spec, where):
+    """data with every default of spec filled in, complains about anything missing or unknown"""
+    if not isinstance(data, dict):
+        raise LevelFileError(f"{where} should be an object, not {data!r}")
+    unknown = [key for key in data if key not in spec]
+    if unknown:
+        raise LevelFileError(f"{where} has unknown field {unknown[0]!r}, it can have {', '.join(spec)}")
+    result = {}
+    for key, default in spec.items():
+        if key in data:
+            result[key] = data[key]
+        elif default is REQUIRED:
+            raise LevelFileError(f"{where} is missing {key!r}")
+        else:
+            result[key] = list(default) if isinstance(default, tuple) else default
+    return result
+
+
+def check_object(data, where):
+    if not isinstance(data, dict) or data.get("type") not in TYPES:
+        raise LevelFileError(f"{where} should have a type, one of {', '.join(TYPES)}")
+    kind = data["type"]
+    cls, spec = TYPES[kind]
+    obj = fields({k: v for k, v in data.items() if k != "type"}, spec, where)
+    obj["type"] = kind
+    obj["pos"] = pair(obj["pos"], f"{where}.pos")
+    obj["size"] = size(obj["size"], f"{where}.size")
+    obj["color"] = color(obj["color"], f"{where}.color", invisible=True)
+    for key in ("sprite", "rushsprite", "lungesprite"):
+        if key in obj:
+            obj[key] = text(obj[key], f"{where}.{key}", optional=True)
+    if kind in FISH:
+        obj["sprite"] = sprite(obj["sprite"], f"{where}.sprite")
+    for key in ("values", "fishvalues"):
+        if key in obj:
+            obj[key] = values(obj[key], f"{where}.{key}", spec[key])
+    if "speed" in obj:
+        number(obj["speed"], f"{where}.speed")
+    if kind == "button":
+        if obj["button"] not in BUTTONS:
+            raise LevelFileError(f"{where}.button should be one of {', '.join(BUTTONS)}, not {obj['button']!r}")
+        # only removewall buttons leave newlevel alone, the others set the water level to it
+        if obj["newlevel"] is not None or obj["button"] != "removewall":
+            number(obj["newlevel"], f"{where}.newlevel")
+        if obj["wallind"] not in ("last", "all"):
+            if not isinstance(obj["wallind"], int) or isinstance(obj["wallind"], bool):
+                raise LevelFileError(f'{where}.wallind should be a wall index, "last" or "all", not {obj["wallind"]!r}')
+    return obj
+
+
+def check_level(data, where):
+    level = fields(data, LEVEL, where)
+    where = f"{where} ({level['id']})" if isinstance(level["id"], str) else where
+    level["id"] = text(level["id"], f"{where}.id")
+    level["size"] = size(level["size"], f"{where}.size")
+    level["water"] = number(level["water"], f"{where}.water")
+    level["text"] = text(level["text"], f"{where}.text", optional=True)
+    level["textpos"] = pair(level["textpos"], f"{where}.textpos")
+
+    player = level["player"] = fields(level["player"], PLAYER, f"{where}.player")
+    player["pos"] = pair(player["pos"], f"{where}.player.pos")
+    player["size"] = size(player["size"], f"{where}.player.size")
+    player["values"] = values(player["values"], f"{where}.player.values", "PLAYERVALS")
+    player["color"] = color(player["color"], f"{where}.player.color")
+    player["image"] = text(player["image"], f"{where}.player.image")
+
+    if not isinstance(level["walls"], list):
+        raise LevelFileError(f"{where}.walls should be a list")
+    walls = []
+    for i, wall in enumerate(level["walls"]):
+        at = f"{where}.walls[{i}]"
+        if not isinstance(wall, list) or len(wall) not in (4, 5):
+            raise LevelFileError(f"{at} should be [x, y, width, height] or [x, y, width, height, color], not {wall!r}")
+        walls.append(tuple(number(v, at) for v in wall[:4]) + ((color(wall[4], f"{at} color"),) if len(wall) == 5 else ()))
+    level["walls"] = walls
+
+    if not isinstance(level["objects"], list):
+        raise LevelFileError(f"{where}.objects should be a list")
+    level["objects"] = [check_object(obj, f"{where}.objects[{i}]") for i, obj in enumerate(level["objects"])]
+    last = 0
+    for i, obj in enumerate(level["objects"]):
+        wallind = obj.get("wallind")
+        if obj.get("button") != "removewall":
+            continue
+        if wallind == "last":
+            last += 1
+            if last > len(walls):
+                raise LevelFileError(f'{where}.objects[{i}] is removewall button number {last} with wallind "last", '
+                                     f"but the level has {len(walls)} walls")
+        elif wallind != "all" and not -len(walls) <= wallind < len(walls):
+            raise LevelFileError(f"{where}.objects[{i}].wallind is {wallind}, but the level has {len(walls)} walls")
+    return level
+
+
+def check(data, path="pack"):
+    """The levels of a parsed pack with every default filled in, raises LevelFileError at the first problem"""
+    if not isinstance(data, dict) or "levels" not in data:
+        raise LevelFileError(f'{path} should be an object with a "levels" list')
+    if data.get("format", FORMAT) != FORMAT:
+        raise LevelFileError(f"{path} is a format {data['format']} pack, this reads format {FORMAT}")
+    if not isinstance(data["levels"], list):
+        raise LevelFileError(f'{path}: "levels" should be a list')
+    result = [check_level(level, f"{path} level {i}") for i, level in enumerate(data["levels"])]
+    seen = set()
+    for level in result:
+        if level["id"] in seen:
+            raise LevelFileError(f"{path} has more than one level called {level['id']!r}")
+        seen.add(level["id"])
+    return result
+
+
+def cachepath(path, data):
+    digest = hashlib.sha1(data).hexdigest()[:20]
+    return os.path.join(os.path.dirname(os.path.abspath(path)), "__levelcache__", f"{digest}.{FORMAT}.{CACHEVERSION}.json")
+
+
+def tuples(value):
+    if isinstance(value, list):
+        return tuple(tuples(v) for v in value)
+    if isinstance(value, dict):
+        return {k: tuples(v) for k, v in value.items()}
+    return value
+
+
+def thaw(specs):
+    """Checked specs as they were before going through json, which turns every tuple into a list
+    (the cache is json and not pickle so that a cache file shipped along with a pack can't run code)"""
+    levels = []
+    for spec in specs:
+        level = tuples(spec)
+        level["walls"], level["objects"] = list(level["walls"]), list(level["objects"])
+        levels.append(level)
+    return levels
+
+
+def parse(path, cache=True):
+    """The checked levels of the pack at path, from the cache if this exact file was checked before"""
+    with open(path, "rb") as file:
+        data = file.read()
+    cached = cachepath(path, data)
+    if cache:
+        try:
+            with open(cached, "rb") as file:
+                return thaw(json.load(file))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring broken level cache {cached}: {e}")
+    try:
+        parsed = json.loads(data)
+    except ValueError as e:  # bad json, or not utf-8 at all (UnicodeDecodeError)
+        raise LevelFileError(f"{path} isn't valid json: {e}") from None
+    specs = check(parsed, path)
+    if cache:
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            with open(cached + ".tmp", "w") as file:
+                json.dump(specs, file)
+            os.replace(cached + ".tmp", cached)
+        except OSError:
+            pass  # can't write next to the pack, it just gets checked every time
+    return specs
+
+
+def preset(value, default):
+    if isinstance(value, str):
+        return getattr(levels, value)
+    return {**getattr(levels, default), **value}
+
+
+def build(spec):
+    """Makes the Level a checked level spec describes"""
+    p = spec["player"]
+    player = Character(p["pos"], *p["size"], preset(p["values"], "PLAYERVALS"), p["color"], p["image"])
+    walls = [Wall(wall[:2], wall[2], wall[3], *wall[4:]) for wall in spec["walls"]]
+    objects = []
+    for i, o in enumerate(spec["objects"]):
+        kind = o["type"]
+        if kind in FISH:
+            # a cached pack skips check(), and the file could have gone since it was checked
+            sprite(o["sprite"], f"{spec['id']}.objects[{i}].sprite")
+        args = (o["pos"], *o["size"], o["color"], o["sprite"])
+        if kind == "smallfish":
+            obj = SmallFish(*args, values=preset(o["values"], "FISHVALS"), speed=o["speed"])
+        elif kind == "bigfish":
+            obj = BigFish(*args, values=preset(o["values"], "FISHVALS"), speed=o["speed"], rushsprite=o["rushsprite"])
+        elif kind == "verybigfish":
+            obj = VeryBigFish(*args, values=preset(o["values"], "VERYBIGFISHVALS"),
+                              fishvalues=preset(o["fishvalues"], "FISHVALS"), speed=o["speed"],
+                              lungesprite=o["lungesprite"])
+        elif kind == "button":
+            obj = Button(*args, o["button"], newlevel=o["newlevel"], wallind=o["wallind"])
+        else:
+            obj = Gun(*args, values=preset(o["values"], "GUNVALS"))
+        objects.append(obj)
+    return Level(spec["id"], player, walls, objects, *spec["size"], spec["water"],
+                 text=spec["text"], textpos=spec["textpos"])
+
+
+def load(path, cache=True):
+    """A LevelList of the levels in the pack at path, each level is only built once it's needed"""
+    return LevelList([functools.partial(build, spec) for spec in parse(path, cache)])
+
+
+class Watcher:
+    """The levels of a pack, kept up to date with the file while the game runs
+    poll() checks the file's modification time every few tenths of a second, when it changed
+    only the levels whose entry in the pack changed get thrown away (to be built again on their next use),
+    sprites come from the assets cache so a rebuild is only the Level itself"""
+    def __init__(self, path, every=0.25):
+        self.path = path
+        self.every = every
+        self.stamp = self.stat()
+        self.specs = parse(path)
+        self.levels = LevelList([functools.partial(build, spec) for spec in self.specs])
+        self.previous = (self.specs, list(self.levels.factories))  # from before the last reload, see keep
+        self.next = time.monotonic() + every
+
+    def stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None  # in the middle of being saved maybe, try again next time
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        """Indexes of the levels that changed since the last call"""
+        now = time.monotonic()
+        if now < self.next:
+            return []
+        self.next = now + self.every
+        stamp = self.stat()
+        if stamp is None or stamp == self.stamp:
+            return []
+        self.stamp = stamp
+        try:
+            # not cached, every save while tuning would leave another file in __levelcache__
+            specs = parse(self.path, cache=False)
+        except (OSError, LevelFileError) as e:
+            print(f"Not reloading {self.path}: {e}")
+            return []
+        changed = [i for i, spec in enumerate(specs) if i >= len(self.specs) or spec != self.specs[i]]
+        for i in range(len(specs), len(self.specs)):
+            self.levels.release(i)
+        self.previous = (self.specs, list(self.levels.factories))
+        self.levels.factories[:] = [functools.partial(build, spec) for spec in specs]
+        for i in changed:
+            self.levels.release(i)
+        self.specs = specs
+        if changed:
+            print(f"Reloaded {', '.join(specs[i]['id'] for i in changed)}")
+        return changed
+
+    def keep(self, i, level):
+        """Goes back to level (the one built before the last reload) as level i,
+        for when the new version of it checked out but couldn't be built. Saving it again retries"""
+        specs, factories = self.previous
+        self.specs[i] = specs[i]
+        self.levels.factories[i] = factories[i]
+        self.levels.built[i] = level
+
+
+def keep_player(old: Level, new: Level):
+    """Puts the player of a reloaded level where it was in the old version, moving and breathing the same,
+    unless it would end up inside a wall or off the screen (then it starts at the start like the rest of the level)"""
+    p, q = old.player, new.player
+    if not p.alive:
+        return False
+    rect = pg.Rect(p.topleft, (q.width, q.height))
+    if new.collide_walls(rect) != -1 or not pg.Rect(0, 0, new.screenwidth, new.screenheight).colliderect(rect):
+        return False
+    q.move(p.topleft)
+    q.prevtopleft.update(p.prevtopleft)
+    q.v.update(p.v)
+    q.oxygen = min(p.oxygen, q.params.maxoxygen)
+    q.gun = q.gun or p.gun
+    q.can_jump = p.can_jump
+    q.jump_timer = p.jump_timer
+    return True
+
+
+def plain(value):
+    """json friendly copy of value, whole floats become ints"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (tuple, list)) or type(value).__name__ in ("Vector2", "Vector3"):
+        return [plain(v) for v in value]
+    return value
+
+
+def presetname(value):
+    for name in PRESETS:
+        if getattr(levels, name) == value:
+            return name
+    return dict(value)
+
+
+def describe(level: Level):
+    """The pack entry of a freshly built (or reset) level, fields left at their defaults are left out"""
+    player = level.player
+    data = {"id": str(level.levelid), "size": [level.screenwidth, level.screenheight], "water": level.waterlevel,
+            "text": level.title if isinstance(level.title, str) else None, "textpos": plain(level.textpos),
+            "player": {"pos": plain(player.startpos), "size": plain((player.width, player.height)),
+                       "values": presetname(player.values), "color": plain(player.color)},
+            "walls": [plain((*wall.topleft, wall.width, wall.height) + ((wall.color,) if wall.color != (0, 0, 0) else ()))
+                      for wall in level.walls],
+            "objects": []}
+    kinds = {cls: kind for kind, (cls, spec) in TYPES.items()}
+    for obj in level.objects:
+        kind = kinds[type(obj)]
+        o = {"type": kind, "pos": plain(obj.startpos), "size": plain((obj.startwidth, obj.startheight)),
+             "color": "invis" if isinstance(obj.startcolor, tuple) else plain(obj.startcolor), "sprite": obj.spritepath}
+        if kind == "button":
+            o.update(button=obj.buttontype, newlevel=obj.newlevel, wallind=obj.wallind)
+        elif kind == "gun":
+            o["values"] = presetname(obj.params._asdict())
+        else:
+            o["speed"] = plain(obj.speed)
+            if kind == "verybigfish":
+                o["values"] = presetname({k: v for k, v in obj.params._asdict().items() if k not in obj.values})
+                o["fishvalues"] = presetname(obj.values)
+                o["lungesprite"] = obj.spritepaths[1]
+            else:
+                o["values"] = presetname(obj.values)
+                if kind == "bigfish":
+                    o["rushsprite"] = obj.spritepaths[1]
+        data["objects"].append({k: v for k, v in o.items() if k == "type" or TYPES[kind][1][k] != plain(v)})
+    data["player"] = {k: v for k, v in data["player"].items() if plain(PLAYER[k]) != v}
+    return {k: v for k, v in data.items() if LEVEL[k] is REQUIRED or plain(LEVEL[k]) != v}
+
+
+def dump(levellist, path):
+    """Writes levels out as a pack, one wall or object per line so the file diffs nicely"""
+    entries = []
+    for i in range(len(levellist)):
+        level = levellist[i]
+        level.reset()
+        data = describe(level)
+        lines = []
+        for key, value in data.items():
+            if key in ("walls", "objects") and value:
+                inner = ",\n    ".join(json.dumps(v) for v in value)
+                lines.append(f'"{key}": [\n    {inner}]')
+            else:
+                lines.append(f"{json.dumps(key)}: {json.dumps(value)}")
+        entries.append("  {" + ",\n   ".join(lines) + "}")
+    with open(path, "w") as file:
+        file.write(f'{{"format": {FORMAT}, "levels": [\n' + ",\n".join(entries) + "\n]}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Level packs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write the levels in levels.py out as a pack")
+    export.add_argument("path")
+    checker = sub.add_parser("check", help="validate packs and list their levels")
+    checker.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        dump(levels.levellist, args.path)
+        print(f"wrote {len(levels.levellist)} levels to {args.path}")
+        return
+    failed = False
+    for path in args.paths:
+        try:
+            specs = parse(path, cache=False)
+        except (OSError, LevelFileError) as e:
+            print(e)
+            failed = True
+            continue
+        print(f"{path}: {len(specs)} levels")
+        for spec in specs:
+            print(f"  {spec['id']:<22} {len(spec['walls']):>3} walls {len(spec['objects']):>3} objects")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
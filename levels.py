@@ -4,16 +4,25 @@ import sys
 import copy
 import random
 import math
+import threading
+import zlib
+from collections import namedtuple
+import assets
+import profiler
+from inputs import InputFrame, poll
+from spatial import Grid, cliphit
 
-pg.init()
 FPS = 60
-FONT = pg.font.SysFont("comicsans", 20)
+TICK = 1 / FPS  # length of one physics step, velocities are in pixels per tick at this rate
+FONT = None  # created on first use, so importing the levels doesn't need pg.init()
+GRIDMIN = 32  # with fewer fish than this, looking through all of them is faster than keeping a grid
+WALLGRIDMIN = 128  # same for walls, pygame checks a short wall list faster than the grid can
 
 PLAYERVALS = {"gravity": 100,
               "waterlift": 100,
               "jump": 15,
-              "jump_cooldown": 0.32,
-              "speed": 50,
+              "jump_cooldown": 0.32,  # in seconds
+              "speed": 50,  # in pixels per second, will need a lot of tweaking
               "terminal": 200,
               "swimspeed": 30,
               "swimterminal": 150,
@@ -52,19 +61,82 @@ VERYBIGFISHVALS = {"lunge_telegraph": 1,
 GUNVALS = {"anim_freq": 2,
            "anim_range": 1}
 
+_params = {}
+
+
+def params(values):
+    """Read-only table of a values dict (PLAYERVALS, FISHVALS...), every entity made from the same values
+    shares the same one instead of carrying its own copy of each number"""
+    key = tuple(sorted(values.items()))
+    table = _params.get(key)
+    if table is None:
+        table = _params[key] = namedtuple("Params", [k for k, v in key])(*[v for k, v in key])
+    return table
+
+
+_slots = {}
+UNSET = object()  # stands in for attributes that were never set (like Character.flipped without an image)
+COPIED = {pg.Vector2, pg.Rect}
+
+
+def slots(cls):
+    """Every attribute an entity class has room for, its own __slots__ and its parents'"""
+    names = _slots.get(cls)
+    if names is None:
+        names = _slots[cls] = tuple(name for kind in reversed(cls.__mro__) for name in getattr(kind, "__slots__", ()))
+    return names
+
+
+def save(obj, rngs):
+    """The values of every attribute of obj as ((name, value) pairs, (name, vector or rect) pairs),
+    the vectors and rects are copies since they get changed in place
+    random number generators go into rngs along with their state"""
+    values, copied = [], []
+    for name in slots(type(obj)):
+        value = getattr(obj, name, UNSET)
+        if type(value) in COPIED:
+            copied.append((name, value.copy()))
+        elif value is not UNSET:
+            if type(value) is random.Random:
+                rngs.append((value, value.getstate()))
+            values.append((name, value))
+    return tuple(values), tuple(copied)
+
+
+def load(obj, state):
+    values, copied = state
+    for name, value in values:
+        setattr(obj, name, value)
+    for name, value in copied:
+        setattr(obj, name, value.copy())  # the snapshot has to stay as it is, it can be restored again
+
+
+def font():
+    global FONT
+    if FONT is None:
+        if not pg.font.get_init():
+            pg.font.init()
+        FONT = pg.font.SysFont("comicsans", 20)
+    return FONT
+
 
 class Character:
+    __slots__ = ("image", "flipped", "color", "topleft", "prevtopleft", "startpos", "width", "height", "pg_rect",
+                 "values", "params", "v", "alive", "gun", "can_jump", "ray_end", "ray_start", "ray_hit", "ray_sprite",
+                 "jump_timer", "oxygen", "water", "level")
+
     def __init__(self, topleft, width, height, values=None, color=(255, 0, 0), image="char.png"):
         if values is None: values = PLAYERVALS.copy()
         try:
-            self.image = pg.transform.scale(pg.image.load(image), (width, height))
-            self.flipped = pg.transform.flip(self.image, True, False)
+            self.image = assets.get(image, (width, height))
+            self.flipped = assets.get(image, (width, height), flipped=True)
         except:
             print(f"Error loading character image {image}")
             self.image = None
         self.color = color
 
         self.topleft = pg.Vector2(topleft)
+        self.prevtopleft = pg.Vector2(topleft)  # position at the previous tick
         self.startpos = pg.Vector2(topleft)
         self.width = width
         self.height = height
@@ -73,41 +145,32 @@ class Character:
 
         self.v = pg.Vector2(0, 0)
 
+        self.params = params(values)  # gravity, speeds, drags... shared with every character made from values
         self.alive = True
         self.gun: bool = values["gun"]
         self.can_jump = False
 
         self.ray_end: pg.Vector2 | None = None
         self.ray_start: pg.Vector2 | None = None
+        self.ray_hit: Wall | Fish | None = None  # whatever the ray stopped at
         self.ray_sprite = None
-        self.gun_strength = values["gun_strength"]
 
-        self.jump_cooldown = values["jump_cooldown"]  # in seconds
         self.jump_timer = 0  # jumping sets this to jump_cooldown, and every frame it decreases by dt until it reaches 0
 
-        self.speed = values["speed"]  # in pixels per second, will need a lot of tweaking
-        self.terminal = values["terminal"]
-        self.airdrag = values["airdrag"]
-
-        self.swimspeed = values["swimspeed"]
-        self.swimterminal = values["swimterminal"]
-        self.waterdrag = values["waterdrag"]
-
-        self.grounddrag = values["grounddrag"]
-
-        self.maxoxygen = values["maxoxygen"]
-        self.oxygen = self.maxoxygen
-        self.o2loss = values["o2loss"]
-
-        self.gravity = values["gravity"]
-        self.waterlift = values["waterlift"]
-        self.jump = values["jump"]
+        self.oxygen = self.params.maxoxygen
+        self.water = 0  # how much of the character was in water at the start of this tick, see in_water
 
         self.level: Level | None = None
 
     def move(self, newtopleft):
-        self.topleft = pg.Vector2(newtopleft)
-        self.pg_rect = pg.Rect(newtopleft, (self.width, self.height))
+        self.topleft.update(newtopleft)
+        self.pg_rect.update(self.topleft, (self.width, self.height))
+
+    def step(self, v, scale):
+        """Same as move(topleft + v * scale) without making any new vectors or rects"""
+        self.topleft.x += v.x * scale
+        self.topleft.y += v.y * scale
+        self.pg_rect.update(self.topleft, (self.width, self.height))
 
     def in_water(self, waterlevel):
         """Returns the percentage of the character's height that is in water"""
@@ -120,99 +183,96 @@ class Character:
         start = pg.Vector2(self.topleft + (self.width / 2, self.height / 2))
         end = start + pg.Vector2(pg.Vector2(mousepos) - start) * 50
 
-        current_max = start.distance_squared_to(end)
-        for rec in self.level.wallrects + list(
-                [obj.pg_rect for obj in self.level.objects if isinstance(obj, Fish) and obj.alive]):
-            if x := pg.Rect.clipline(rec, start, end):
-                if (d := start.distance_squared_to(pg.Vector2(x[0]))) < current_max:
-                    current_max = d
-                    end = x[0]
-                if (d := start.distance_squared_to(pg.Vector2(x[1]))) < current_max:
-                    current_max = d
-                    end = x[1]
-
         self.ray_start = start
-        self.ray_end = end
-
-    def inputs(self, dt, waterlevel):
-
-        for event in pg.event.get():
-            if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+        self.ray_end, self.ray_hit = self.level.raycast(start, end)
+
+    def inputs(self, dt, waterlevel, frame: InputFrame | None = None):
+        """Applies one frame of controls and physics to the character,
+        reads the keyboard and mouse if no input frame is given"""
+        if frame is None:
+            frame = poll()
+            if frame.quit:
                 pg.quit()
                 sys.exit()
-            # single click inputs, continuous inputs are handled below
-            if self.in_water(waterlevel) < 1:
-                if event.type == KEYDOWN and event.key == K_SPACE and self.can_jump:
-                    self.can_jump = False
-                    self.jump_timer = self.jump_cooldown
-                    self.v.y = -self.jump
-
-        keys = pg.key.get_pressed()
+        p = self.params
+        # the character only moves at the end of the tick, so this holds for the whole tick (fish look at it too)
+        water = self.water = self.in_water(waterlevel)
+
+        # single click inputs, continuous inputs are handled below
+        if water < 1:
+            if frame.jump and self.can_jump:
+                self.can_jump = False
+                self.jump_timer = p.jump_cooldown
+                self.v.y = -p.jump
+
         # gravity
-        self.v.y += self.gravity * dt
+        self.v.y += p.gravity * dt
         # jump timer
         if self.jump_timer >= 0:
             self.jump_timer -= dt
 
-        if self.in_water(waterlevel) > 0.4:
+        if water > 0.4:
             # player head being in water drains oxygen
-            if self.in_water(waterlevel) > 0.9:
-                self.oxygen -= self.o2loss * dt
+            if water > 0.9:
+                self.oxygen -= p.o2loss * dt
             # being in water resets jump
             if self.jump_timer <= 0:
                 self.can_jump = True
             # water lift
-            self.v.y -= self.waterlift * self.in_water(waterlevel) * dt
+            self.v.y -= p.waterlift * water * dt
             # movement in water
-            if keys[K_a]:  # left
-                self.v.x -= self.swimspeed * dt
-            if keys[K_d]:  # right
-                self.v.x += self.swimspeed * dt
-            if keys[K_w] or keys[K_SPACE]:  # up
-                self.v.y -= self.swimspeed * dt
-            if keys[K_s]:  # down
-                self.v.y += self.swimspeed * dt
+            if frame.left:
+                self.v.x -= p.swimspeed * dt
+            if frame.right:
+                self.v.x += p.swimspeed * dt
+            if frame.up:
+                self.v.y -= p.swimspeed * dt
+            if frame.down:
+                self.v.y += p.swimspeed * dt
 
             # water drag
-            self.v *= 1 - self.waterdrag * dt
+            self.v *= 1 - p.waterdrag * dt
 
             # terminal velocity in water
-            self.v.x = max(-self.swimterminal, min(self.v.x, self.swimterminal))
-            self.v.y = max(-self.swimterminal, min(self.v.y, self.swimterminal))
+            self.v.x = max(-p.swimterminal, min(self.v.x, p.swimterminal))
+            self.v.y = max(-p.swimterminal, min(self.v.y, p.swimterminal))
 
             # increase oxygen until max oxygen if not in water
-        if self.in_water(waterlevel) < 0.9 and self.oxygen != self.maxoxygen:
-            self.oxygen = min(self.oxygen + self.o2loss * 4 * dt, self.maxoxygen)
+        if water < 0.9 and self.oxygen != p.maxoxygen:
+            self.oxygen = min(self.oxygen + p.o2loss * 4 * dt, p.maxoxygen)
         else:
             # movement out of water
-            if keys[K_a]:  # left
-                self.v.x -= self.speed * dt
-            if keys[K_d]:  # right
-                self.v.x += self.speed * dt
+            if frame.left:
+                self.v.x -= p.speed * dt
+            if frame.right:
+                self.v.x += p.speed * dt
 
             # air drag
-            self.v *= 1 - self.airdrag * dt
+            self.v *= 1 - p.airdrag * dt
 
             # terminal velocity out of water
-            self.v.x = max(-self.terminal, min(self.v.x, self.terminal))
-            self.v.y = max(-self.terminal, min(self.v.y, self.terminal))
+            self.v.x = max(-p.terminal, min(self.v.x, p.terminal))
+            self.v.y = max(-p.terminal, min(self.v.y, p.terminal))
 
-        mouse = pg.mouse.get_pressed()
-        if mouse[0]:
-            self.shoot(pg.mouse.get_pos())
+        if frame.shoot:
+            self.shoot(frame.mousepos)
         else:
-            self.ray_start = self.ray_end = None
+            self.ray_start = self.ray_end = self.ray_hit = None
 
     def reset(self):
         self.move(self.startpos)
+        self.prevtopleft.update(self.topleft)
         self.v = pg.Vector2(0, 0)
-        self.oxygen = self.maxoxygen
+        self.oxygen = self.params.maxoxygen
+        self.water = 0
         self.alive = True
         self.can_jump = False
         self.gun = self.values["gun"]
 
 
 class Wall:
+    __slots__ = ("topleft", "width", "height", "pg_rect", "color")
+
     def __init__(self, topleft, width, height, color=(0, 0, 0)):
         self.topleft = pg.Vector2(topleft)
         self.width = width
@@ -225,8 +285,12 @@ class Wall:
 
 
 class Object:
+    __slots__ = ("topleft", "prevtopleft", "color", "startpos", "startcolor", "startwidth", "startheight", "pg_rect",
+                 "width", "height", "spritepath", "spritepaths", "sprite", "sprites", "flippedsprites", "spriteindex")
+
     def __init__(self, topleft, width, height, color, sprite=None):
         self.topleft = pg.Vector2(topleft)
+        self.prevtopleft = pg.Vector2(topleft)  # position at the previous tick
         if color == "invis":
             self.color = (255, 255, 255, 0)
         else:
@@ -241,57 +305,73 @@ class Object:
         self.width = width
         self.height = height
 
+        self.spritepath = sprite
+        self.spritepaths = [sprite]  # one per animation frame, every resize scales these again from the original files
         try:
-            self.sprite = pg.transform.scale(pg.image.load(sprite), (width, height))
+            self.sprite = assets.get(sprite, (width, height))
         except Exception:
             print(f"Error loading sprite: {sprite}")
             self.sprite = None
 
         self.sprites = [self.sprite]
         if self.sprite != None:
-            self.flippedsprites = [pg.transform.flip(self.sprite, True, False)]
+            self.flippedsprites = [assets.get(sprite, (width, height), flipped=True)]
         else:
             self.flippedsprites = [None]
         self.spriteindex = 0
 
     def move(self, newtopleft):
-        self.topleft = pg.Vector2(newtopleft)
-        self.pg_rect = pg.Rect(newtopleft, (self.width, self.height))
+        self.topleft.update(newtopleft)
+        self.pg_rect.update(self.topleft, (self.width, self.height))
+
+    def step(self, v, scale):
+        """Same as move(topleft + v * scale) without making any new vectors or rects"""
+        self.topleft.x += v.x * scale
+        self.topleft.y += v.y * scale
+        self.pg_rect.update(self.topleft, (self.width, self.height))
         
     def resize(self, newwidth, newheight):
         self.width = newwidth
         self.height = newheight
-        self.pg_rect = pg.Rect(self.topleft, (newwidth, newheight))
+        self.pg_rect.update(self.topleft, (newwidth, newheight))
         if self.sprite != None:
-            self.sprite = pg.transform.scale(self.sprite, (newwidth, newheight))
-            for sprite in self.sprites:
-                sprite = pg.transform.scale(sprite, (newwidth, newheight))
-            for sprite in self.flippedsprites:
-                sprite = pg.transform.scale(sprite, (newwidth, newheight))
+            size = (newwidth, newheight)
+            if size != (self.startwidth, self.startheight):
+                # a fish under the shrink ray gets resized every frame, snapping the size
+                # makes it reuse the same few cached surfaces instead of scaling a new one each time
+                size = assets.quantize(size)
+            flipped = self.sprite in self.flippedsprites
+            self.sprites = [assets.get(path, size) if path is not None else None for path in self.spritepaths]
+            self.flippedsprites = [assets.get(path, size, flipped=True) if path is not None else None
+                                   for path in self.spritepaths]
+            self.sprite = (self.flippedsprites if flipped else self.sprites)[self.spriteindex]
 
     def reset(self):
         self.move(self.startpos)
+        self.prevtopleft.update(self.topleft)
         self.resize(self.startwidth, self.startheight)
         self.color = self.startcolor
 
 
 class Gun(Object):
+    __slots__ = ("picked", "params", "animation_timer")
+
     def __init__(self, topleft, width, height, color, sprite, values):
         super().__init__(topleft, width, height, color, sprite)
         self.picked = False
-        self.animation_frequency = values["anim_freq"]  # the frequency of the guns movement
-        # (it moves up and down like a dropped item in mc lmao)
-        self.animation_range = values["anim_range"]  # how many pixels the gun will go up and down
+        # anim_freq: the frequency of the guns movement (it moves up and down like a dropped item in mc lmao)
+        # anim_range: how many pixels the gun will go up and down
+        self.params = params(values)
         self.animation_timer = 0
 
     def f(self, x):
-        return pg.Vector2(0, math.sin(3.14 * x * self.animation_frequency) * self.animation_range)
+        return pg.Vector2(0, math.sin(3.14 * x * self.params.anim_freq) * self.params.anim_range)
     
     def animation(self, dt):
         if not self.picked:
             if self.animation_timer >= 1:
                 self.animation_timer = 0
-            self.move(self.topleft + self.f(self.animation_timer))
+            self.step(self.f(self.animation_timer), dt / TICK)
             self.animation_timer += dt
             
     def reset(self):
@@ -301,6 +381,8 @@ class Gun(Object):
 
 
 class Button(Object):
+    __slots__ = ("pressed", "buttontype", "newlevel", "wallind")
+
     def __init__(self, topleft, width, height, color, sprite, buttontype, newlevel=0, wallind=0):
         super().__init__(topleft, width, height, color, sprite)
         self.pressed = False
@@ -310,23 +392,24 @@ class Button(Object):
 
     def raisewater(self, level):
         level.waterlevel = self.newlevel
+        level.invalidate_background()
 
     def lowerwater(self, level):
         level.waterlevel = self.newlevel
+        level.invalidate_background()
 
     def removewall(self, level):
+        if not level.walls:
+            return  # earlier buttons took out every wall
         if self.wallind == "last":
-            level.walls.pop()
-            level.wallrects.pop()
+            level.remove_wall(-1)
             return
         if self.wallind == "all":
-            level.walls = []
-            level.wallrects = []
-            return
-        if self.wallind >= len(level.walls):
+            level.clear_walls()
             return
-        level.walls.pop(self.wallind)
-        level.wallrects.pop(self.wallind)
+        if not -len(level.walls) <= self.wallind < len(level.walls):
+            return  # earlier buttons took out walls before it
+        level.remove_wall(self.wallind)
 
     def reset(self):
         self.pressed = False
@@ -334,6 +417,9 @@ class Button(Object):
 
 
 class Fish(Object):
+    __slots__ = ("existed", "alive", "speed", "v", "rng", "params", "oxygen", "big_range", "small_range",
+                 "fastspeed", "rushspeed", "normalsprite", "values")
+
     def __init__(self, topleft, width, height, color, sprite, values, speed, existed=True):
         super().__init__(topleft, width, height, color, sprite)
 
@@ -341,13 +427,10 @@ class Fish(Object):
         self.alive = True
         self.speed = speed
         self.v = pg.Vector2(0, 0)
+        self.rng: random.Random | None = None  # own random numbers, the level's are used if None (see Level.reseed)
 
-        self.gravity = values["gravity"]
-        self.airdrag = values["airdrag"]
-
-        self.maxoxygen = values["maxoxygen"]
-        self.o2loss = values["o2loss"]
-        self.oxygen = self.maxoxygen
+        self.params = params(values)  # gravity, airdrag, maxoxygen, o2loss, shared by every fish with the same values
+        self.oxygen = self.params.maxoxygen
 
         self.big_range = self.width * 6
         self.small_range = self.width * 3
@@ -355,41 +438,82 @@ class Fish(Object):
         self.fastspeed = self.speed * 3
         self.rushspeed = self.speed * 6
 
-        self.normalsprite = pg.transform.scale(pg.image.load(sprite), (self.width, self.height))
+        self.normalsprite = assets.get(sprite, (self.width, self.height))
         
         self.values = values
 
     def alg(self, level: 'Level', dt):
-        self.v += pg.Vector2(random.random() * self.speed / 2 - self.speed / 4,
-                             random.random() * self.speed / 2 - self.speed / 4) * 60 * dt
-        if self.v.length_squared() != 0:
-            self.v = self.v.normalize() * self.speed
+        rng = self.rng or level.rng
+        v = self.v
+        v.x += (rng.random() * self.speed / 2 - self.speed / 4) * FPS * dt
+        v.y += (rng.random() * self.speed / 2 - self.speed / 4) * FPS * dt
+        if v.length_squared() != 0:
+            v.normalize_ip()
+            v *= self.speed
+
+    def head(self, target, speed):
+        """Points v at target (away from it if speed is negative), in place"""
+        v = self.v
+        v.update(target)
+        v -= self.topleft
+        v.normalize_ip()
+        v *= speed
             
     def shrink(self, level: 'Level', newwidth, newheight):
         self.resize(newwidth, newheight)
         if self.width < 50:
             if isinstance(self, VeryBigFish):
-                self.alive = False
-                level.objects.append(BigFish(self.topleft, self.width, self.height, self.color, "bigfish.png", self.values, self.speed*2, "bigfish_rush.png", False))
+                level.kill(self)
+                level.spawn_fish(BigFish, self.topleft, self.width, self.height, self.color, self.values, self.speed*2,
+                                 sprite="bigfish.png", rushsprite="bigfish_rush.png")
             if self.width < 30:
                 if isinstance(self, BigFish):
-                    self.alive = False
-                    level.objects.append(SmallFish(self.topleft, self.width, self.height, self.color, "smallfish.png", self.values, self.speed*2, False))
+                    level.kill(self)
+                    level.spawn_fish(SmallFish, self.topleft, self.width, self.height, self.color, self.values,
+                                     self.speed*2, sprite="smallfish.png")
                 if self.width < 5:
-                    self.alive = False
+                    level.kill(self)
         
 
+    def respawn(self, topleft, width, height, color, values, speed):
+        """Turns a dead fish from the level's pool into what constructing it again with these arguments would give,
+        only the sprites of the new size get looked up (and they're usually cached already)"""
+        self.startpos.update(topleft)
+        self.move(topleft)
+        self.prevtopleft.update(self.topleft)
+        self.color = self.startcolor = pg.Vector3(color)
+        self.startwidth = width
+        self.startheight = height
+        self.spriteindex = 0
+        self.sprite = self.sprites[0]
+        self.resize(width, height)
+
+        self.alive = True
+        self.speed = speed
+        self.v.update(0, 0)
+        self.rng = None
+        self.params = params(values)
+        self.oxygen = self.params.maxoxygen
+        self.big_range = self.width * 6
+        self.small_range = self.width * 3
+        self.fastspeed = self.speed * 3
+        self.rushspeed = self.speed * 6
+        self.normalsprite = self.sprites[0]
+        self.values = values
+
     def reset(self):
         if self.existed:
             self.v = pg.Vector2(0, 0)
             self.alive = True
-            self.oxygen = self.maxoxygen
+            self.oxygen = self.params.maxoxygen
             super().reset()
         else:
             self.alive = False
             
             
 class SmallFish(Fish):
+    __slots__ = ()
+
     def __init__(self, topleft, width, height, color, sprite, values, speed, existed=True):
         super().__init__(topleft, width, height, color, sprite, values, speed, existed)
 
@@ -399,41 +523,49 @@ class SmallFish(Fish):
             return
 
         if self.topleft.y <= level.waterlevel:
-            self.v.y += self.gravity * dt
+            self.v.y += self.params.gravity * dt
             if self.v.y < 0:
-                self.v *= (1 - self.airdrag * dt)
-            self.oxygen -= self.o2loss * dt
+                self.v *= (1 - self.params.airdrag * dt)
+            self.oxygen -= self.params.o2loss * dt
             if self.oxygen <= 0:
-                self.alive = False
+                level.kill(self)
             return
 
-        if self.oxygen < self.maxoxygen:
-            self.oxygen += self.o2loss * 2 * dt
+        if self.oxygen < self.params.maxoxygen:
+            self.oxygen += self.params.o2loss * 2 * dt
 
         if self.topleft.distance_to(level.player.topleft) < self.small_range:
-            self.v = (self.topleft - level.player.topleft).normalize() * self.rushspeed
+            self.head(level.player.topleft, -self.rushspeed)
             return
 
         if self.topleft.distance_to(level.player.topleft) < self.big_range:
-            self.v = (self.topleft - level.player.topleft).normalize() * self.fastspeed
+            self.head(level.player.topleft, -self.fastspeed)
             return
 
         super().alg(level, dt)
 
 
 class BigFish(Fish):
+    __slots__ = ("rushsprite",)
+
     def __init__(self, topleft, width, height, color, sprite, values, speed, rushsprite="bigfish_rush.png", existed=True):
         super().__init__(topleft, width, height, color, sprite, values, speed, existed)
         try:
-            self.rushsprite = pg.transform.scale(pg.image.load(rushsprite), (self.width, self.height))
+            self.rushsprite = assets.get(rushsprite, (self.width, self.height))
             self.sprites.append(self.rushsprite)
-            self.flippedsprites.append(pg.transform.flip(self.rushsprite, True, False))
+            self.flippedsprites.append(assets.get(rushsprite, (self.width, self.height), flipped=True))
+            self.spritepaths.append(rushsprite)
         except Exception:
             print(f"Error loading sprite: {rushsprite}")
             self.rushsprite = None
+            self.spritepaths.append(None)
             self.sprites.append(None)
             self.flippedsprites.append(None)
 
+    def respawn(self, topleft, width, height, color, values, speed):
+        super().respawn(topleft, width, height, color, values, speed)
+        self.rushsprite = self.sprites[1]
+
     def alg(self, level: 'Level', dt):
 
         if self.spriteindex != 0:
@@ -443,63 +575,59 @@ class BigFish(Fish):
             return
 
         if self.topleft.y <= level.waterlevel:
-            self.v.y += self.gravity * dt
+            self.v.y += self.params.gravity * dt
             if self.v.y < 0:
-                self.v *= (1 - self.airdrag * dt)
-            self.oxygen -= self.o2loss * dt
+                self.v *= (1 - self.params.airdrag * dt)
+            self.oxygen -= self.params.o2loss * dt
             if self.oxygen <= 0:
-                self.alive = False
+                level.kill(self)
             return
 
-        if self.oxygen < self.maxoxygen:
-            self.oxygen += self.o2loss * 2 * dt
-
-        if any([isinstance(obj, SmallFish) and obj.alive for obj in level.objects]):
-            closest = 5000  # just a number longer than the longest possible distance
-            closestfish = None
-            for obj in level.objects:
-                dist = self.topleft.distance_to(obj.topleft)
-                if isinstance(obj, SmallFish) and obj.alive and dist < closest:
-                    closest = dist
-                    closestfish = obj
+        if self.oxygen < self.params.maxoxygen:
+            self.oxygen += self.params.o2loss * 2 * dt
 
+        closestfish, closest = level.closest_fish(self, SmallFish)
+        if closestfish is not None:
             if closest < self.width / 2 + closestfish.width / 2:
                 # self.spriteindex = 1 # rush sprite
-                closestfish.v = pg.Vector2(0, 0)
-                closestfish.alive = False
+                closestfish.v.update(0, 0)
+                level.kill(closestfish)
                 return
             elif closest < self.small_range:
                 if self.spriteindex != 1:
                     self.spriteindex = 1  # rush sprite
-                self.v = pg.Vector2(closestfish.topleft - self.topleft).normalize() * self.rushspeed
+                self.head(closestfish.topleft, self.rushspeed)
                 return
             elif closest < self.big_range:
-                self.v = pg.Vector2(closestfish.topleft - self.topleft).normalize() * self.fastspeed
+                self.head(closestfish.topleft, self.fastspeed)
                 return
 
         super().alg(level, dt)
 
 
 class VeryBigFish(Fish):
+    __slots__ = ("lungesprite", "lungedistance", "lungespeed", "lunge_timer")
+
     def __init__(self, topleft, width, height, color, sprite, values, fishvalues, speed,
                  lungesprite="verybigfish_lunge.png", existed=True):
         super().__init__(topleft, width, height, color, sprite, values=fishvalues, speed=speed, existed=existed)
         try:
-            self.lungesprite = pg.transform.scale(pg.image.load(lungesprite), (self.width, self.height))
+            self.lungesprite = assets.get(lungesprite, (self.width, self.height))
             self.sprites.append(self.lungesprite)
-            self.flippedsprites.append(pg.transform.flip(self.lungesprite, True, False))
+            self.flippedsprites.append(assets.get(lungesprite, (self.width, self.height), flipped=True))
+            self.spritepaths.append(lungesprite)
         except Exception:
             print(f"Error loading sprite: {lungesprite}")
             self.lungesprite = None
+            self.spritepaths.append(None)
             self.sprites.append(None)
             self.flippedsprites.append(None)
 
         self.lungedistance = self.width * 2
         self.lungespeed = self.speed * 10
 
-        self.lunge_duration = values["lunge_duration"]
-        self.lunge_telegraph = values["lunge_telegraph"]
-        self.lunge_timer = self.lunge_telegraph
+        self.params = params({**fishvalues, **values})  # lunge_duration and lunge_telegraph on top of the fish ones
+        self.lunge_timer = self.params.lunge_telegraph
 
     def alg(self, level: 'Level', dt):
 
@@ -510,48 +638,41 @@ class VeryBigFish(Fish):
             self.spriteindex = 0
 
         if self.topleft.y <= level.waterlevel:
-            self.v.y += self.gravity * dt
+            self.v.y += self.params.gravity * dt
             if self.v.y < 0:
-                self.v *= (1 - self.airdrag * dt)
-            self.oxygen -= self.o2loss * dt
+                self.v *= (1 - self.params.airdrag * dt)
+            self.oxygen -= self.params.o2loss * dt
             if self.oxygen <= 0:
-                self.alive = False
+                level.kill(self)
             return
 
-        if self.oxygen < self.maxoxygen:
-            self.oxygen += self.o2loss * 2 * dt
+        if self.oxygen < self.params.maxoxygen:
+            self.oxygen += self.params.o2loss * 2 * dt
 
         player = level.player
-        if player.in_water(level.waterlevel) > 0 and self.topleft.distance_to(player.topleft) < self.big_range:
+        if player.water > 0 and self.topleft.distance_to(player.topleft) < self.big_range:
             if self.topleft.distance_to(player.topleft) > self.lungedistance:
                 self.spriteindex = 0
-                self.lunge_timer = self.lunge_telegraph
+                self.lunge_timer = self.params.lunge_telegraph
                 self.color = self.startcolor
-                self.v = pg.Vector2(player.topleft - self.topleft).normalize() * self.speed * 2
+                self.head(player.topleft, self.speed * 2)
                 return
             else:
                 self.spriteindex = 1
                 self.lunge(player.topleft, dt)
                 return
 
-        elif any([(isinstance(obj, SmallFish) or isinstance(obj, BigFish)) and obj.alive for obj in level.objects]):
-            closest = 5000  # just a number longer than the longest possible distance
-            closestfish = None
-            for obj in level.objects:
-                dist = self.topleft.distance_to(obj.topleft)
-                if (isinstance(obj, SmallFish) or
-                        isinstance(obj, BigFish)) and obj.alive and dist < closest:
-                    closest = dist
-                    closestfish = obj
+        closestfish, closest = level.closest_fish(self, (SmallFish, BigFish))
+        if closestfish is not None:
             if closest < self.width / 2 + closestfish.width / 2:
-                closestfish.v = pg.Vector2(0, 0)
-                closestfish.alive = False
+                closestfish.v.update(0, 0)
+                level.kill(closestfish)
             elif closest < self.small_range:
                 self.spriteindex = 1
-                self.v = pg.Vector2(closestfish.topleft - self.topleft).normalize() * self.rushspeed
+                self.head(closestfish.topleft, self.rushspeed)
                 return
             elif closest < self.big_range:
-                self.v = pg.Vector2(closestfish.topleft - self.topleft).normalize() * self.fastspeed
+                self.head(closestfish.topleft, self.fastspeed)
                 return
 
         super().alg(level, dt)
@@ -559,23 +680,39 @@ class VeryBigFish(Fish):
     def lunge(self, target, dt):
         if self.lunge_timer <= 0.1:
             self.spriteindex = 1
-            self.lunge_timer = self.lunge_telegraph + self.lunge_duration
+            self.lunge_timer = self.params.lunge_telegraph + self.params.lunge_duration
             self.color = self.startcolor
-            self.v = pg.Vector2(target - self.topleft).normalize() * self.speed * 8
-        elif self.lunge_timer <= self.lunge_telegraph:
+            self.head(target, self.speed * 8)
+        elif self.lunge_timer <= self.params.lunge_telegraph:
             self.spriteindex = 0
-            self.v = pg.Vector2(target - self.topleft).normalize() * self.speed * 0.01
+            self.head(target, self.speed)
+            self.v *= 0.01
         self.lunge_timer -= dt
-        self.color = self.color + ((200, 20, 0) - self.startcolor) * (dt / self.lunge_telegraph)
+        self.color = self.color + ((200, 20, 0) - self.startcolor) * (dt / self.params.lunge_telegraph)
         if self.color[0] > 230 or self.color[1] < 10:
             self.color = pg.Vector3(200, 20, 0)
         
     
     def reset(self):
-        self.lunge_timer = self.lunge_telegraph
+        self.lunge_timer = self.params.lunge_telegraph
         super().reset()
 
 
+class Snapshot:
+    """Everything about a level that can change while it's played, see Level.snapshot"""
+    __slots__ = ("player", "objects", "walls", "waterlevel", "cleared", "seed", "rngs", "swarm")
+
+    def __init__(self, player, objects, walls, waterlevel, cleared, seed, rngs, swarm):
+        self.player = player  # attribute values, see save
+        self.objects = objects  # (object, attribute values) in self.objects order
+        self.walls = walls  # walls never change, they only get removed, so the same Wall objects are kept
+        self.waterlevel = waterlevel
+        self.cleared = cleared
+        self.seed = seed
+        self.rngs = rngs  # (random.Random, state) of the level and of fish with their own
+        self.swarm = swarm  # state of the swarm's random numbers, if it had one
+
+
 class Level:
     def __init__(self, levelid, char, walls: list[Wall], objects: list[Object], screenwidth=500, screenheight=500, waterlevel=100, text=None, textpos=(0,0)):
         self.screenwidth = screenwidth
@@ -588,18 +725,236 @@ class Level:
         self.objects: list[Object] = objects  # list of non-wall objects, each object contains top left position, a width and height and color for the hitbox, and a sprite
         self.waterlevel = waterlevel  # the height of the water level, above this y value (so lower on the screen) is water and above it is air
         self.cleared = False  # whether the level has been cleared or not
-        self.copies = [[wall.copy() for wall in walls], waterlevel]
-        self.text = text
+        self.title = text  # the level title, only rendered once it's actually shown
+        self._text = None
         self.textpos = textpos
+        self.seed = zlib.crc32(str(levelid).encode())  # a fresh level always plays out the same with the same inputs
+        self.rng = random.Random(self.seed)  # random numbers for the fish, see reseed
+        self.swarm = None  # numpy fish engine, see use_swarm
+        self.backdrop: pg.Surface | None = None  # pre-drawn static part of the screen, see background
+        self.fishgrid: Grid | None = None  # live fish by position, rebuilt every update
+        self.probe = pg.Rect(0, 0, 0, 0)  # reused for every wall collision check
+        # what's still in play, kept up to date by spawn/kill/pick/press so nothing has to sort through self.objects
+        self.live: dict[Object, None] = {}  # alive fish, unpicked guns and unpressed buttons, in self.objects order
+        self.species: dict[type, dict[Fish, None]] = {}  # alive fish by class (and by every fish class above it)
+        self.fish: dict[Fish, None] = {}  # every alive fish, same as species[Fish]
+        self.guns: dict[Gun, None] = {}  # unpicked guns
+        self.buttons: dict[Button, None] = {}  # unpressed buttons
+        self.pool: dict[type, list[Fish]] = {}  # dead fish the shrink ray made, by class, reused by spawn_fish
+        self.index_objects()
+        self.wallgrid: Grid | None = None  # indexes into wallrects, rebuilt whenever the walls change
+        self.index_walls()
+        self.initial = self.snapshot()  # what reset goes back to
+
+    @property
+    def text(self):
+        if self._text is None and self.title is not None:
+            self._text = font().render(self.title, True, (255, 0, 0)) if isinstance(self.title, str) else self.title
+        return self._text
+
+    def use_swarm(self, seed=None):
+        """Runs the fish of this level on the numpy engine in swarm.py instead of one alg() call per fish,
+        only worth it with hundreds of fish"""
+        from swarm import FishSwarm
+        self.swarm = FishSwarm([obj for obj in self.objects if isinstance(obj, Fish)],
+                               self.seed if seed is None else seed)
+
+    def reseed(self, seed=None, perfish=False):
+        """Restarts the random numbers the fish wander with, same seed and same inputs means the same game
+        with perfish every fish gets a stream of its own, so adding or removing a fish
+        doesn't change what the others do (fish spawned later by the shrink ray still share the level's)"""
+        if seed is not None:
+            self.seed = seed
+        self.rng.seed(self.seed)
+        for i, obj in enumerate(self.objects):
+            if isinstance(obj, Fish):
+                obj.rng = random.Random(f"{self.seed}/{i}") if perfish else None
+        if self.swarm is not None:
+            self.use_swarm()
+
+    def background(self, size):
+        """Everything on screen that only changes when a button is pressed or the level resets:
+        the white, the water, the walls and the title, drawn once and reused every frame"""
+        if self.backdrop is None or self.backdrop.get_size() != size:
+            w, h = size
+            surf = pg.Surface(size)
+            if pg.display.get_surface() is not None:
+                surf = surf.convert()
+            surf.fill((255, 255, 255))
+            # walls go over the water, so the water can't be drawn on top of this later
+            pg.draw.rect(surf, (0, 0, 180), (0, self.waterlevel, w, h - self.waterlevel))
+            for wall in self.walls:
+                pg.draw.rect(surf, wall.color, wall.pg_rect)
+            if self.text is not None:
+                surf.blit(self.text, self.textpos)
+            self.backdrop = surf
+        return self.backdrop
+
+    def invalidate_background(self):
+        self.backdrop = None
+
+    def index_walls(self):
+        if len(self.wallrects) < WALLGRIDMIN:
+            self.wallgrid = None
+            return
+        self.wallgrid = Grid()
+        for i, rect in enumerate(self.wallrects):
+            self.wallgrid.insert(i, rect)
+
+    def remove_wall(self, index):
+        self.walls.pop(index)
+        self.wallrects.pop(index)
+        self.index_walls()
+        self.invalidate_background()
+
+    def clear_walls(self):
+        self.walls = []
+        self.wallrects = []
+        self.index_walls()
+        self.invalidate_background()
+
+    def collide_walls(self, rect):
+        """Index of the first wall rect overlaps or -1, same answer as rect.collidelist(self.wallrects)"""
+        if self.wallgrid is None:
+            return rect.collidelist(self.wallrects)
+        wallrects = self.wallrects
+        for i in self.wallgrid.query(rect):
+            if rect.colliderect(wallrects[i]):
+                return i
+        return -1
+
+    def index_objects(self):
+        self.live, self.guns, self.buttons = {}, {}, {}
+        self.species = {kind: {} for kind in (Fish, SmallFish, BigFish, VeryBigFish)}
+        self.fish = self.species[Fish]
+        for obj in self.objects:
+            self.register(obj)
 
-    def check_player_wall_collisions(self):
-        X_newrect = pg.Rect(self.player.topleft + (self.player.v.x, 0), (self.player.width, self.player.height))
-        Y_newrect = pg.Rect(self.player.topleft + (0, self.player.v.y), (self.player.width, self.player.height))
-        XY_newrect = pg.Rect(self.player.topleft + self.player.v,
-                             (self.player.width, self.player.height))  # corner clip fix
+    def register(self, obj):
+        if isinstance(obj, Fish):
+            if not obj.alive:
+                return
+            for kind in type(obj).__mro__:
+                if issubclass(kind, Fish):
+                    self.species.setdefault(kind, {})[obj] = None
+        elif isinstance(obj, Gun):
+            if obj.picked:
+                return
+            self.guns[obj] = None
+        elif isinstance(obj, Button):
+            if obj.pressed:
+                return
+            self.buttons[obj] = None
+        else:
+            return
+        self.live[obj] = None
+
+    def unregister(self, obj):
+        self.live.pop(obj, None)
+        self.guns.pop(obj, None)
+        self.buttons.pop(obj, None)
+        for kind in type(obj).__mro__:
+            if kind in self.species:
+                self.species[kind].pop(obj, None)
+
+    def spawn(self, obj):
+        """Adds an object to the level mid game (like a smaller fish coming out of a shrunk one)"""
+        self.objects.append(obj)
+        self.register(obj)
+
+    def spawn_fish(self, kind, topleft, width, height, color, values, speed, **sprites):
+        """Spawns a fish that wasn't in the level at the start, reusing a dead one from an earlier attempt if there is one"""
+        pooled = self.pool.get(kind)
+        if pooled:
+            fish = pooled.pop()
+            fish.respawn(topleft, width, height, color, values, speed)
+        else:
+            fish = kind(topleft, width, height, color, values=values, speed=speed, existed=False, **sprites)
+        self.spawn(fish)
+        return fish
+
+    def kill(self, fish):
+        fish.alive = False
+        self.unregister(fish)
+
+    def pick(self, gun):
+        gun.picked = True
+        self.unregister(gun)
+        self.player.gun = True
+
+    def press(self, button):
+        button.pressed = True
+        self.unregister(button)
+        if button.buttontype == "raisewater":
+            button.raisewater(self)
+        elif button.buttontype == "lowerwater":
+            button.lowerwater(self)
+        elif button.buttontype == "removewall":
+            button.removewall(self)
+
+    def index_fish(self):
+        fishes = list(self.fish)
+        if len(fishes) < GRIDMIN:
+            self.fishgrid = None
+            return
+        if self.fishgrid is None:
+            self.fishgrid = Grid()
+        else:
+            self.fishgrid.clear()
+        for fish in fishes:
+            self.fishgrid.insert(fish, fish.pg_rect)
+
+    def closest_fish(self, fish, kinds):
+        """The closest alive fish of one of kinds to fish (between top left corners) and its distance,
+        only looks as far as fish could care about, (None, inf) if there's nothing there"""
+        if self.fishgrid is None:
+            closest = math.inf
+            closestfish = None
+            candidates = self.species.get(kinds, ()) if isinstance(kinds, type) else self.fish
+            for obj in candidates:
+                if isinstance(obj, kinds):
+                    dist = fish.topleft.distance_to(obj.topleft)
+                    if dist < closest:
+                        closest = dist
+                        closestfish = obj
+            return closestfish, closest
+        # far enough to see anything it would chase or is touching
+        radius = max(fish.big_range, fish.width / 2 + self.fishgrid.maxwidth / 2)
+        return self.fishgrid.nearest(fish.topleft, radius, lambda obj: isinstance(obj, kinds) and obj.alive)
+
+    def raycast(self, start, end):
+        """Where the segment from start to end first runs into a wall or a live fish and what it ran into,
+        (end, None) if it doesn't hit anything"""
+        bestdist, point, hit = start.distance_squared_to(end), end, None
+
+        if self.wallgrid is None:
+            for wall, rect in zip(self.walls, self.wallrects):
+                if (clip := cliphit(rect, start, end)) and clip[0] < bestdist:
+                    bestdist, point, hit = clip[0], clip[1], wall
+        elif (clip := self.wallgrid.raycast(start, end, self.wallrects.__getitem__)) and clip[0] < bestdist:
+            bestdist, point, hit = clip[0], clip[1], self.walls[clip[2]]
+
+        if self.fishgrid is None:
+            for obj in self.fish:
+                if (clip := cliphit(obj.pg_rect, start, end)) and clip[0] < bestdist:
+                    bestdist, point, hit = clip[0], clip[1], obj
+        elif (clip := self.fishgrid.raycast(start, end, lambda obj: obj.pg_rect, lambda obj: obj.alive)) \
+                and clip[0] < bestdist:
+            bestdist, point, hit = clip
+        return point, hit
+
+    def check_player_wall_collisions(self, dt):
+        player = self.player
+        x, y = player.topleft
+        dx, dy = player.v.x * (dt / TICK), player.v.y * (dt / TICK)
+        # where the player would be after moving only sideways, only up/down and both (corner clip fix),
+        # all checked with the same rect
+        probe = self.probe
         res = [False, False, False, False]
-        x_check = pg.Rect.collidelist(X_newrect, self.wallrects)
-        y_check = pg.Rect.collidelist(Y_newrect, self.wallrects)
+        probe.update(x + dx, y, player.width, player.height)
+        x_check = self.collide_walls(probe)
+        probe.update(x, y + dy, player.width, player.height)
+        y_check = self.collide_walls(probe)
         # not corner
         if x_check != -1 or y_check != -1:
             # left-right
@@ -620,58 +975,57 @@ class Level:
                     res[3] = True
 
         # corner
-        elif pg.Rect.collidelist(XY_newrect, self.wallrects) != -1:
-            # up-left
-            if self.player.v.x <= 0 and self.player.v.y <= 0:
-                res[0] = True
-                res[2] = True
-            # up-right
-            elif self.player.v.x >= 0 and self.player.v.y <= 0:
-                res[1] = True
-                res[2] = True
-            # down-left
-            elif self.player.v.x <= 0 and self.player.v.y >= 0:
-                res[0] = True
-                res[3] = True
-            # down-right
-            elif self.player.v.x >= 0 and self.player.v.y >= 0:
-                res[1] = True
-                res[3] = True
+        else:
+            probe.update(x + dx, y + dy, player.width, player.height)
+            if self.collide_walls(probe) != -1:
+                # up-left
+                if self.player.v.x <= 0 and self.player.v.y <= 0:
+                    res[0] = True
+                    res[2] = True
+                # up-right
+                elif self.player.v.x >= 0 and self.player.v.y <= 0:
+                    res[1] = True
+                    res[2] = True
+                # down-left
+                elif self.player.v.x <= 0 and self.player.v.y >= 0:
+                    res[0] = True
+                    res[3] = True
+                # down-right
+                elif self.player.v.x >= 0 and self.player.v.y >= 0:
+                    res[1] = True
+                    res[3] = True
 
         return res
 
     def check_player_object_collisions(self):
-        for obj in self.objects:
-            if self.player.pg_rect.colliderect(obj.pg_rect):
-                if isinstance(obj, VeryBigFish) and obj.alive:
-                    self.player.alive = False
-                if isinstance(obj, Gun) and not obj.picked:
-                    self.player.gun = True
-                    obj.picked = True
-                if isinstance(obj, Button) and not obj.pressed:
-                    obj.pressed = True
-                    if obj.buttontype == "raisewater":
-                        obj.raisewater(self)
-                    elif obj.buttontype == "lowerwater":
-                        obj.lowerwater(self)
-                    elif obj.buttontype == "removewall":
-                        obj.removewall(self)
+        rect = self.player.pg_rect
+        for fish in self.species[VeryBigFish]:
+            if rect.colliderect(fish.pg_rect):
+                self.player.alive = False
+        for gun in list(self.guns):
+            if rect.colliderect(gun.pg_rect):
+                self.pick(gun)
+        for button in list(self.buttons):
+            if rect.colliderect(button.pg_rect):
+                self.press(button)
 
         return False
 
     def check_object_wall_collisions(self, obj, dt):
-        X_newrect = pg.Rect(obj.topleft + (obj.v.x * 60 * dt, 0), (obj.width, obj.height))
-        Y_newrect = pg.Rect(obj.topleft + (0, obj.v.y * 60 * dt), (obj.width, obj.height))
+        x, y = obj.topleft
+        probe = self.probe
         res = [False, False, False, False]
         # left-right
-        if pg.Rect.collidelist(X_newrect, self.wallrects) != -1:
+        probe.update(x + obj.v.x * (dt / TICK), y, obj.width, obj.height)
+        if self.collide_walls(probe) != -1:
             # left
             if obj.topleft[0] <= 0 or obj.v.x < 0:
                 res[0] = True
             # right
             else:
                 res[1] = True
-        if pg.Rect.collidelist(Y_newrect, self.wallrects) != -1:
+        probe.update(x, y + obj.v.y * (dt / TICK), obj.width, obj.height)
+        if self.collide_walls(probe) != -1:
             # up
             if obj.topleft[1] - obj.height <= 0 or obj.v.y < 0:
                 res[2] = True
@@ -680,52 +1034,100 @@ class Level:
                 res[3] = True
         return res
 
+    def snapshot(self):
+        """Saves the state of the level (player, fish, guns, buttons, walls, water and random numbers)
+        so restore can put it back later, as many times as needed"""
+        rngs = [(self.rng, self.rng.getstate())]
+        player = save(self.player, rngs)
+        objects = tuple((obj, save(obj, rngs)) for obj in self.objects)
+        swarm = self.swarm.rng.bit_generator.state if self.swarm is not None else None
+        return Snapshot(player, objects, tuple(self.walls), self.waterlevel, self.cleared, self.seed, tuple(rngs), swarm)
+
+    def restore(self, snapshot: Snapshot):
+        """Puts the level back exactly the way it was when snapshot was taken, only attributes get set back
+        so nothing is loaded or scaled again (sprites of the old size are still around from back then)"""
+        load(self.player, snapshot.player)
+        kept = {obj for obj, values in snapshot.objects}
+        for obj in self.objects:
+            # fish the shrink ray made since the snapshot aren't needed anymore, spawn_fish can use them again
+            if isinstance(obj, Fish) and not obj.existed and obj not in kept:
+                self.pool.setdefault(type(obj), []).append(obj)
+        for kind, pooled in self.pool.items():
+            pooled[:] = [fish for fish in pooled if fish not in kept]
+        self.objects[:] = [obj for obj, values in snapshot.objects]
+        for obj, values in snapshot.objects:
+            load(obj, values)
+        for rng, state in snapshot.rngs:
+            rng.setstate(state)
+        self.seed = snapshot.seed
+        self.cleared = snapshot.cleared
+
+        if self.waterlevel != snapshot.waterlevel or self.walls != list(snapshot.walls):
+            self.waterlevel = snapshot.waterlevel
+            self.walls = list(snapshot.walls)
+            self.wallrects = [wall.pg_rect for wall in self.walls]
+            self.index_walls()
+            self.invalidate_background()
+        self.index_objects()
+        if self.swarm is not None:
+            if snapshot.swarm is not None:
+                self.swarm.rng.bit_generator.state = snapshot.swarm
+            self.swarm.load([obj for obj in self.objects if isinstance(obj, Fish)])
+
     def reset(self):
-        self.player.reset()
+        self.restore(self.initial)
 
-        for obj in self.objects:
-            obj.reset()
+    def update(self, dt, frame: InputFrame | None = None):
+        """Advances the level by dt seconds, meant to be called with a fixed dt (TICK)"""
+        prof = profiler.active
+        if prof: prof.mark("fish grid")
 
-        self.cleared = False
-        self.walls = self.copies[0]
-        self.wallrects = [wall.pg_rect for wall in self.copies[0]]
-        self.waterlevel = self.copies[1]
+        # remember where everything was, so the renderer can draw in between two ticks
+        self.player.prevtopleft.update(self.player.topleft)
+        for obj in self.live:
+            obj.prevtopleft.update(obj.topleft)
 
-    def update(self, dt):
+        if self.swarm is None:
+            self.index_fish()
 
         # ----- PLAYER INPUTS / MOVEMENT -----
 
-        self.player.inputs(dt, self.waterlevel)
+        if prof: prof.mark("inputs + ray")
+        self.player.inputs(dt, self.waterlevel, frame)
         
-        if self.player.gun and self.player.ray_end != None:
-            for obj in self.objects:
-                if obj.pg_rect.collidepoint(self.player.ray_end):
-                    if isinstance(obj, Fish) and obj.alive:
-                        newwidth = obj.width - obj.width * self.player.gun_strength * dt
-                        newheight = obj.height - obj.height * self.player.gun_strength * dt
-                        obj.shrink(self, newwidth, newheight)
-                        
+        if prof: prof.mark("shrink")
+        obj = self.player.ray_hit
+        if self.player.gun and isinstance(obj, Fish) and obj.alive:
+            fishcount = len(self.objects)
+            newwidth = obj.width - obj.width * self.player.params.gun_strength * dt
+            newheight = obj.height - obj.height * self.player.params.gun_strength * dt
+            obj.shrink(self, newwidth, newheight)
+            if self.swarm is not None:
+                self.swarm.load([obj for obj in self.objects if isinstance(obj, Fish)])
+            elif len(self.objects) != fishcount:
+                self.index_fish()  # a smaller fish came out of it
 
         # PLAYER WALL COLLISION DETECTION
 
-        collisions = self.check_player_wall_collisions()
+        if prof: prof.mark("player walls")
+        collisions = self.check_player_wall_collisions(dt)
 
         if any(collisions):
             # left collision
             if collisions[0]:
-                self.player.v.y *= (1 - self.player.grounddrag * dt)
+                self.player.v.y *= (1 - self.player.params.grounddrag * dt)
                 self.player.v.x = max(0, self.player.v.x)
             # right collision
             if collisions[1]:
-                self.player.v.y *= (1 - self.player.grounddrag * dt)
+                self.player.v.y *= (1 - self.player.params.grounddrag * dt)
                 self.player.v.x = min(0, self.player.v.x)
             # up collision
             if collisions[2]:
-                self.player.v.x *= (1 - self.player.grounddrag * dt)
+                self.player.v.x *= (1 - self.player.params.grounddrag * dt)
                 self.player.v.y = max(0, self.player.v.y)
             # down collision
             if collisions[3]:
-                self.player.v.x *= (1 - self.player.grounddrag * 2 * dt)
+                self.player.v.x *= (1 - self.player.params.grounddrag * 2 * dt)
                 self.player.v.y = min(0, self.player.v.y)
                 # touching the ground resets jump
                 if self.player.jump_timer <= 0:
@@ -733,16 +1135,21 @@ class Level:
 
         # ----- OBJECT PATHFINDING / MOVEMENT -----
 
-        for obj in self.objects:
-            if isinstance(obj, Fish):
-                obj.alg(self, dt)
-            if isinstance(obj, Gun):
-                obj.animation(dt)
+        if prof: prof.mark("fish ai")
+        if self.swarm is None:
+            for fish in list(self.fish):  # fish get eaten while this runs
+                fish.alg(self, dt)
+        for gun in self.guns:
+            gun.animation(dt)
 
         # OBJECT WALL COLLISION DETECTION
 
-        for i, obj in enumerate(self.objects):
-            if isinstance(obj, Fish):
+        if prof: prof.mark("fish walls")
+        if self.swarm is not None:
+            self.swarm.think(self, dt)  # ai and wall collisions for all the fish at once
+
+        if self.swarm is None:
+            for obj in self.fish:
                 collisions = self.check_object_wall_collisions(obj, dt)
                 if any(collisions):
                     # left-right collision
@@ -752,434 +1159,496 @@ class Level:
                     if any(collisions[2:4]):
                         obj.v.y = -obj.v.y
 
+        if prof: prof.mark("player objects")
         self.check_player_object_collisions()
 
         if self.player.oxygen <= 0:
             self.player.alive = False
 
-        self.player.move(self.player.topleft + self.player.v)
+        if prof: prof.mark("move")
+        self.player.step(self.player.v, dt / TICK)
         
         
 
-        for obj in self.objects:
-            if isinstance(obj, Fish):
-                obj.move(obj.topleft + obj.v)
+        if self.swarm is not None:
+            self.swarm.move(dt)
+        else:
+            for obj in self.fish:
+                obj.step(obj.v, dt / TICK)
 
         if self.player.topleft[0] + self.player.width > self.screenwidth:
             self.cleared = True
         
         elif self.player.topleft[1] > self.screenheight:
             self.player.alive = False
-
-
-level0 = Level("0_base",
-               Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 500),
-                   Wall((435, 88), 65, 412),
-                   Wall((0, 450), 500, 50),
-                   Wall((0, 0), 1, 100)
-               ],
-               [],
-               500,
-               500,
-               100,
-               text = FONT.render(f"Level 1: Learn to swim!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level1 = Level("1_onewall",
-               Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 500),
-                   Wall((435, 88), 65, 412),
-                   Wall((0, 450), 500, 50),
-                   Wall((0, 0), 1, 100),
-                   Wall((230, 0), 40, 350)
-               ],
-               [],
-               500,
-               500,
-               100,
-               text = FONT.render(f"Level 2: Learn to dive!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level2 = Level("2_threewalls",
-               Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 500),
-                   Wall((435, 88), 65, 412),
-                   Wall((0, 450), 500, 50),
-                   Wall((0, 0), 1, 100),
-                   Wall((120, 0), 40, 350),
-                   Wall((350, 0), 40, 350),
-                   Wall((230, 90), 40, 410)
-               ],
-               [],
-               500,
-               500,
-               100,
-               text = FONT.render(f"Level 3: Learn to navigate!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level3 = Level("3_onesmallfish",
-               Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 500),
-                   Wall((435, 88), 65, 412),
-                   Wall((0, 450), 500, 50),
-                   Wall((0, 0), 1, 100)
-               ],
-               [
-                   SmallFish((240, 240), 15, 15, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5)
-               ],
-               500,
-               500,
-               100,
-               text = FONT.render(f"Level 4: Observe cute little fish!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level4 = Level("4_threesmallfish",
-               Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 500),
-                   Wall((435, 88), 65, 412),
-                   Wall((0, 450), 500, 50),
-                   Wall((0, 0), 1, 100)
-               ],
-               [
-                   SmallFish((240, 240), 15, 15, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-                   SmallFish((130, 200), 25, 25, (20, 225, 0), "smallfish.png", values=FISHVALS, speed=1.3),
-                   SmallFish((340, 350), 22, 22, (30, 205, 20), "smallfish.png", values=FISHVALS, speed=1.4)
-               ],
-               500,
-               500,
-               100,
-               text = FONT.render(f"Level 5: Observe many cute little fishes!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level5 = Level("5_bigfish_smallfish",
-               Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 500),
-                   Wall((435, 88), 65, 412),
-                   Wall((0, 450), 500, 50),
-                   Wall((0, 0), 1, 100)
-               ],
-               [
-                   SmallFish((240, 240), 15, 15, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-                   BigFish((75, 130), 50, 50, (200, 155, 0), "bigfish.png", values=FISHVALS, speed=0.6,
-                           rushsprite="bigfish_rush.png")
-               ],
-               500,
-               500,
-               100,
-               text = FONT.render(f"Level 6: Learn a valuable life lesson!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level6 = Level("6_feeding",
-               Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 510),
-                   Wall((535, 88), 65, 512),
-                   Wall((0, 550), 600, 50),
-                   Wall((0, 0), 1, 200),
-               ],
-               [
-                   BigFish((300, 300), 40, 40, (200, 155, 0), "bigfish.png", values=FISHVALS, speed=0.6,
-                           rushsprite="bigfish_rush.png"),
-                   SmallFish((240, 240), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-                   SmallFish((120, 240), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-                   SmallFish((130, 100), 15, 15, (20, 150, 50), "smallfish.png", values=FISHVALS, speed=1.5),
-                   SmallFish((340, 350), 12, 12, (40, 200, 10), "smallfish.png", values=FISHVALS, speed=1.5),
-                   SmallFish((500, 400), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-               ],
-               600,
-               600,
-               100,
-               text = FONT.render(f"Level 7: Learn many valuable life lessons!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level7 = Level("7_cage",
-               Character((5, 5), 30, 30, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 810),
-                   Wall((835, 88), 65, 812),
-                   Wall((0, 850), 900, 50),
-                   Wall((0, 0), 1, 200),
-                   Wall((150, 150), 450, 10),
-                   Wall((150, 150), 10, 450),
-                   Wall((600, 150), 10, 450),
-                   Wall((150, 600), 460, 10),
-               ],
-               [
-                   VeryBigFish((450, 450), 120, 90, (130, 50, 0), "verybigfish.png",
-                               values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                   BigFish((350, 300), 40, 40, (150, 155, 0), "bigfish.png", values=FISHVALS, speed=1,
-                           rushsprite="bigfish_rush.png"),
-                   SmallFish((240, 240), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-                   SmallFish((220, 370), 10, 10, (0, 210, 30), "smallfish.png", values=FISHVALS, speed=1.5),
-                   SmallFish((305, 820), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-               ],
-               900,
-               900,
-               100,
-               text = FONT.render(f"Level 8: Appreciate the value of cages!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-
-level8 = Level("8_brokencage",
-               Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
-               [Wall((0, 90), 65, 810),
-                Wall((835, 88), 65, 812),
-                Wall((0, 850), 900, 50),
-                Wall((0, 0), 1, 200),
-                Wall((150, 150), 450, 10),
-                Wall((150, 150), 10, 450),
-                Wall((600, 150), 10, 100),
-                Wall((600, 500), 10, 100),
-                Wall((150, 600), 460, 10),
-                Wall((600, 250), 20, 10),
-                Wall((600, 500), 20, 10),
-                ],
-               [VeryBigFish((380, 350), 120, 90, (130, 50, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.5, lungesprite="verybigfish_lunge.png"),
-                SmallFish((700, 350), 10, 10,  (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-                SmallFish((600, 300), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=2),
-                SmallFish((650, 330), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=2),
-                SmallFish((680, 430), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=2),
-                BigFish((500, 400), 30, 30, (150, 205, 0), "bigfish.png", values=FISHVALS, speed=1),
-                SmallFish((450, 450), 12, 12, (40, 220, 10), "smallfish.png", values=FISHVALS, speed=1.5),
-                SmallFish((500, 400), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
-                ],
-               900,
-               900,
-               100,
-               text = FONT.render(f"Level 9: Appreciate the value of cages more!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-level9 = Level("9_parkour",
-               Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
-               [
-                   Wall((0, 90), 65, 810),
-                    Wall((835, 88), 65, 812),
-                    Wall((0, 850), 900, 50),
-                    Wall((0, 0), 1, 200),
-                    Wall((100, 70), 50, 10),
-                    Wall((250, 70), 50, 10),
-                    Wall((400, 70), 50, 10),
-                    Wall((550, 70), 50, 10),
-                    Wall((700, 70), 50, 10)
-                ],
-               [
-                   VeryBigFish((150, 250), 90, 90, (140, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.5, lungesprite="verybigfish_lunge.png"),
-                    VeryBigFish((350, 440), 230, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.6, lungesprite="verybigfish_lunge.png"),
-                    VeryBigFish((650, 380), 160, 125, (200, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.5, lungesprite="verybigfish_lunge.png"),
-                    VeryBigFish((500, 400), 130, 100, (200, 205, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.4, lungesprite="verybigfish_lunge.png"),
-                ],
-               900,
-               900,
-               150,
-               text = FONT.render(f"Level 10: Hone your platforming skills!", True, (255, 0, 0)),
-               textpos = (0, 0)
-                )
-
-
-level10 = Level("10_fishdie",
-                Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
-                [
-                    Wall((0, 90), 65, 810),
-                    Wall((835, 88), 65, 812),
-                    Wall((0, 850), 900, 50),
-                    Wall((0, 0), 1, 200),
-                    Wall((100, 70), 50, 10),
-                    Wall((250, 70), 50, 10),
-                    Wall((400, 70), 50, 10),
-                    Wall((0, 850), 900, 50),
-                    Wall((65, 205), 50, 10),
-                    Wall((65, 150), 50, 10)
-                ],
-                [
-                    VeryBigFish((350, 440), 190, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                    VeryBigFish((650, 380), 125, 125, (200, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                    VeryBigFish((500, 400), 100, 100, (200, 205, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                    Button((65, 190), 15, 15, (240, 240, 240), None, "lowerwater", newlevel=900),
-                    Button((800, 834), 15, 15, (20, 20, 240), None, "raisewater", newlevel=90)
-                ],
-                900,
-                900,
-                150,
-                text = FONT.render(f"Level 11: Buttons 101!", True, (255, 0, 0)),
-                textpos = (0, 0)
-                )
-
-level11 = Level("11_blocked",
-                Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
-                [
-                    Wall((0, 90), 65, 810),
-                    Wall((835, 88), 65, 812),
-                    Wall((0, 850), 900, 50),
-                    Wall((0, 0), 1, 200),
-                    Wall((100, 70), 50, 10),
-                    Wall((250, 70), 50, 10),
-                    Wall((400, 70), 50, 10),
-                    Wall((0, 850), 900, 50),
-                    Wall((830, 20), 8, 100),
-                    Wall((823, 20), 8, 100),
-                    Wall((815, 20), 8, 100),
-                ],
-                [
-                    VeryBigFish((350, 440), 190, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                    VeryBigFish((650, 380), 125, 125, (200, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                    VeryBigFish((500, 400), 100, 100, (200, 205, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                    Button((65, 490), 25, 25, (60, 0, 60), None, "removewall", newlevel=None, wallind=10),
-                    Button((450, 824), 25, 25, (60, 0, 60), None, "removewall", newlevel=None, wallind=9),
-                    Button((810, 490), 25, 25, (60, 0, 60), None, "removewall", newlevel=None, wallind=8)
-                ],
-                900,
-                900,
-                110,
-                text = FONT.render(f"Level 12: Buttons 102!", True, (255, 0, 0)),
-                textpos = (0, 0)
-                )
-
-level12 = Level("12_gun_pickup",
-                Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
-                [
-                    Wall((0, 90), 65, 810),
-                    Wall((835, 0), 65, 300),
-                    Wall((835, 500), 65, 400),
-                    Wall((0, 850), 900, 50),
-                    Wall((0, 0), 1, 200),
-                    Wall((100, 70), 50, 10),
-                    Wall((270, 70), 50, 10),
-                    Wall((430, 80), 70, 10),
-                    Wall((0, 850), 900, 50),
-                    Wall((815, 300), 8, 200)
-                ],
-                [
-                    VeryBigFish((200, 150), 190, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
-                    Gun((450, 30), 30, 30, (100, 100, 100), "gun.png", values=GUNVALS),
-                    Button((390, 30), 50, 50, "invis", None, "removewall", newlevel=None, wallind=8),
-                    Button((490, 30), 50, 50, "invis", None, "removewall", newlevel=None, wallind=8),
-                ],
-                900,
-                900,
-                110,
-                text = FONT.render(f"Level 13: Shrink Ray 101!     Hold left click to shoot", True, (255, 0, 0)),
-                textpos = (0, 0)
-                )
+        if prof: prof.end()
+
+
+class LevelList:
+    """A list of level factories, each level only gets built the first time it's asked for
+    prefetch() builds a level in a background thread so it's ready by the time it's needed,
+    release() throws away a built level once the game is done with it"""
+    def __init__(self, factories):
+        self.factories = list(factories)
+        self.built: dict[int, Level] = {}
+        self.pending: dict[int, threading.Thread] = {}
+
+    def __len__(self):
+        return len(self.factories)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.factories)
+        if i in self.pending:
+            self.pending.pop(i).join()
+        level = self.built.get(i)
+        if level is None:
+            level = self.built[i] = self.factories[i]()
+        return level
+
+    def __iter__(self):
+        for i in range(len(self.factories)):
+            yield self[i]
+
+    def prefetch(self, i):
+        if not 0 <= i < len(self.factories) or i in self.built or i in self.pending:
+            return
+        thread = threading.Thread(target=self._build, args=(i,), daemon=True)
+        self.pending[i] = thread
+        thread.start()
+
+    def _build(self, i):
+        self.built[i] = self.factories[i]()
+
+    def release(self, i):
+        if i in self.pending:
+            self.pending.pop(i).join()
+        self.built.pop(i, None)
+
+
+def level0():
+    return Level("0_base",
+                 Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 500),
+                     Wall((435, 88), 65, 412),
+                     Wall((0, 450), 500, 50),
+                     Wall((0, 0), 1, 100)
+                 ],
+                 [],
+                 500,
+                 500,
+                 100,
+                 text="Level 1: Learn to swim!",
+                 textpos=(0, 0)
+                  )
+
+def level1():
+    return Level("1_onewall",
+                 Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 500),
+                     Wall((435, 88), 65, 412),
+                     Wall((0, 450), 500, 50),
+                     Wall((0, 0), 1, 100),
+                     Wall((230, 0), 40, 350)
+                 ],
+                 [],
+                 500,
+                 500,
+                 100,
+                 text="Level 2: Learn to dive!",
+                 textpos=(0, 0)
+                  )
+
+def level2():
+    return Level("2_threewalls",
+                 Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 500),
+                     Wall((435, 88), 65, 412),
+                     Wall((0, 450), 500, 50),
+                     Wall((0, 0), 1, 100),
+                     Wall((120, 0), 40, 350),
+                     Wall((350, 0), 40, 350),
+                     Wall((230, 90), 40, 410)
+                 ],
+                 [],
+                 500,
+                 500,
+                 100,
+                 text="Level 3: Learn to navigate!",
+                 textpos=(0, 0)
+                  )
+
+def level3():
+    return Level("3_onesmallfish",
+                 Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 500),
+                     Wall((435, 88), 65, 412),
+                     Wall((0, 450), 500, 50),
+                     Wall((0, 0), 1, 100)
+                 ],
+                 [
+                     SmallFish((240, 240), 15, 15, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5)
+                 ],
+                 500,
+                 500,
+                 100,
+                 text="Level 4: Observe cute little fish!",
+                 textpos=(0, 0)
+                  )
+
+def level4():
+    return Level("4_threesmallfish",
+                 Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 500),
+                     Wall((435, 88), 65, 412),
+                     Wall((0, 450), 500, 50),
+                     Wall((0, 0), 1, 100)
+                 ],
+                 [
+                     SmallFish((240, 240), 15, 15, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((130, 200), 25, 25, (20, 225, 0), "smallfish.png", values=FISHVALS, speed=1.3),
+                     SmallFish((340, 350), 22, 22, (30, 205, 20), "smallfish.png", values=FISHVALS, speed=1.4)
+                 ],
+                 500,
+                 500,
+                 100,
+                 text="Level 5: Observe many cute little fishes!",
+                 textpos=(0, 0)
+                  )
+
+def level5():
+    return Level("5_bigfish_smallfish",
+                 Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 500),
+                     Wall((435, 88), 65, 412),
+                     Wall((0, 450), 500, 50),
+                     Wall((0, 0), 1, 100)
+                 ],
+                 [
+                     SmallFish((240, 240), 15, 15, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                     BigFish((75, 130), 50, 50, (200, 155, 0), "bigfish.png", values=FISHVALS, speed=0.6,
+                             rushsprite="bigfish_rush.png")
+                 ],
+                 500,
+                 500,
+                 100,
+                 text="Level 6: Learn a valuable life lesson!",
+                 textpos=(0, 0)
+                  )
+
+def level6():
+    return Level("6_feeding",
+                 Character((5, 5), 40, 40, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 510),
+                     Wall((535, 88), 65, 512),
+                     Wall((0, 550), 600, 50),
+                     Wall((0, 0), 1, 200),
+                 ],
+                 [
+                     BigFish((300, 300), 40, 40, (200, 155, 0), "bigfish.png", values=FISHVALS, speed=0.6,
+                             rushsprite="bigfish_rush.png"),
+                     SmallFish((240, 240), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((120, 240), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((130, 100), 15, 15, (20, 150, 50), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((340, 350), 12, 12, (40, 200, 10), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((500, 400), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                 ],
+                 600,
+                 600,
+                 100,
+                 text="Level 7: Learn many valuable life lessons!",
+                 textpos=(0, 0)
+                  )
+
+def level7():
+    return Level("7_cage",
+                 Character((5, 5), 30, 30, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 810),
+                     Wall((835, 88), 65, 812),
+                     Wall((0, 850), 900, 50),
+                     Wall((0, 0), 1, 200),
+                     Wall((150, 150), 450, 10),
+                     Wall((150, 150), 10, 450),
+                     Wall((600, 150), 10, 450),
+                     Wall((150, 600), 460, 10),
+                 ],
+                 [
+                     VeryBigFish((450, 450), 120, 90, (130, 50, 0), "verybigfish.png",
+                                 values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     BigFish((350, 300), 40, 40, (150, 155, 0), "bigfish.png", values=FISHVALS, speed=1,
+                             rushsprite="bigfish_rush.png"),
+                     SmallFish((240, 240), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((220, 370), 10, 10, (0, 210, 30), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((305, 820), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                 ],
+                 900,
+                 900,
+                 100,
+                 text="Level 8: Appreciate the value of cages!",
+                 textpos=(0, 0)
+                  )
+
+def level8():
+    return Level("8_brokencage",
+                 Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [Wall((0, 90), 65, 810),
+                  Wall((835, 88), 65, 812),
+                  Wall((0, 850), 900, 50),
+                  Wall((0, 0), 1, 200),
+                  Wall((150, 150), 450, 10),
+                  Wall((150, 150), 10, 450),
+                  Wall((600, 150), 10, 100),
+                  Wall((600, 500), 10, 100),
+                  Wall((150, 600), 460, 10),
+                  Wall((600, 250), 20, 10),
+                  Wall((600, 500), 20, 10),
+                  ],
+                 [VeryBigFish((380, 350), 120, 90, (130, 50, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.5, lungesprite="verybigfish_lunge.png"),
+                  SmallFish((700, 350), 10, 10,  (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                  SmallFish((600, 300), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=2),
+                  SmallFish((650, 330), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=2),
+                  SmallFish((680, 430), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=2),
+                  BigFish((500, 400), 30, 30, (150, 205, 0), "bigfish.png", values=FISHVALS, speed=1),
+                  SmallFish((450, 450), 12, 12, (40, 220, 10), "smallfish.png", values=FISHVALS, speed=1.5),
+                  SmallFish((500, 400), 10, 10, (0, 255, 0), "smallfish.png", values=FISHVALS, speed=1.5),
+                  ],
+                 900,
+                 900,
+                 100,
+                 text="Level 9: Appreciate the value of cages more!",
+                 textpos=(0, 0)
+                  )
+
+def level9():
+    return Level("9_parkour",
+                 Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 810),
+                      Wall((835, 88), 65, 812),
+                      Wall((0, 850), 900, 50),
+                      Wall((0, 0), 1, 200),
+                      Wall((100, 70), 50, 10),
+                      Wall((250, 70), 50, 10),
+                      Wall((400, 70), 50, 10),
+                      Wall((550, 70), 50, 10),
+                      Wall((700, 70), 50, 10)
+                  ],
+                 [
+                     VeryBigFish((150, 250), 90, 90, (140, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.5, lungesprite="verybigfish_lunge.png"),
+                      VeryBigFish((350, 440), 230, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.6, lungesprite="verybigfish_lunge.png"),
+                      VeryBigFish((650, 380), 160, 125, (200, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.5, lungesprite="verybigfish_lunge.png"),
+                      VeryBigFish((500, 400), 130, 100, (200, 205, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.4, lungesprite="verybigfish_lunge.png"),
+                  ],
+                 900,
+                 900,
+                 150,
+                 text="Level 10: Hone your platforming skills!",
+                 textpos=(0, 0)
+                  )
+
+def level10():
+    return Level("10_fishdie",
+                 Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 810),
+                     Wall((835, 88), 65, 812),
+                     Wall((0, 850), 900, 50),
+                     Wall((0, 0), 1, 200),
+                     Wall((100, 70), 50, 10),
+                     Wall((250, 70), 50, 10),
+                     Wall((400, 70), 50, 10),
+                     Wall((0, 850), 900, 50),
+                     Wall((65, 205), 50, 10),
+                     Wall((65, 150), 50, 10)
+                 ],
+                 [
+                     VeryBigFish((350, 440), 190, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     VeryBigFish((650, 380), 125, 125, (200, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     VeryBigFish((500, 400), 100, 100, (200, 205, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     Button((65, 190), 15, 15, (240, 240, 240), None, "lowerwater", newlevel=900),
+                     Button((800, 834), 15, 15, (20, 20, 240), None, "raisewater", newlevel=90)
+                 ],
+                 900,
+                 900,
+                 150,
+                 text="Level 11: Buttons 101!",
+                 textpos=(0, 0)
+                 )
+
+def level11():
+    return Level("11_blocked",
+                 Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 810),
+                     Wall((835, 88), 65, 812),
+                     Wall((0, 850), 900, 50),
+                     Wall((0, 0), 1, 200),
+                     Wall((100, 70), 50, 10),
+                     Wall((250, 70), 50, 10),
+                     Wall((400, 70), 50, 10),
+                     Wall((0, 850), 900, 50),
+                     Wall((830, 20), 8, 100),
+                     Wall((823, 20), 8, 100),
+                     Wall((815, 20), 8, 100),
+                 ],
+                 [
+                     VeryBigFish((350, 440), 190, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     VeryBigFish((650, 380), 125, 125, (200, 155, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     VeryBigFish((500, 400), 100, 100, (200, 205, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     Button((65, 490), 25, 25, (60, 0, 60), None, "removewall", newlevel=None, wallind=10),
+                     Button((450, 824), 25, 25, (60, 0, 60), None, "removewall", newlevel=None, wallind=9),
+                     Button((810, 490), 25, 25, (60, 0, 60), None, "removewall", newlevel=None, wallind=8)
+                 ],
+                 900,
+                 900,
+                 110,
+                 text="Level 12: Buttons 102!",
+                 textpos=(0, 0)
+                 )
+
+def level12():
+    return Level("12_gun_pickup",
+                 Character((5, 5), 20, 20, PLAYERVALS, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 90), 65, 810),
+                     Wall((835, 0), 65, 300),
+                     Wall((835, 500), 65, 400),
+                     Wall((0, 850), 900, 50),
+                     Wall((0, 0), 1, 200),
+                     Wall((100, 70), 50, 10),
+                     Wall((270, 70), 50, 10),
+                     Wall((430, 80), 70, 10),
+                     Wall((0, 850), 900, 50),
+                     Wall((815, 300), 8, 200)
+                 ],
+                 [
+                     VeryBigFish((200, 150), 190, 190, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.8, lungesprite="verybigfish_lunge.png"),
+                     Gun((450, 30), 30, 30, (100, 100, 100), "gun.png", values=GUNVALS),
+                     Button((390, 30), 50, 50, "invis", None, "removewall", newlevel=None, wallind=8),
+                     Button((490, 30), 50, 50, "invis", None, "removewall", newlevel=None, wallind=8),
+                 ],
+                 900,
+                 900,
+                 110,
+                 text="Level 13: Shrink Ray 101!     Hold left click to shoot",
+                 textpos=(0, 0)
+                 )
 
 # USE PLAYERVALS2 FROM NOW ON
 
-level13 = Level("13_gun",
-                Character((5, 330), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
-                [   
-                    Wall((0, 250), 1, 300),
-                    Wall((0, 0), 360, 300),
-                    Wall((0, 375), 360, 600),
-                    Wall((320, 500), 600, 500),
-                    Wall((0, 0), 1, 200),
-                    Wall((631, 375), 300, 300),
-                    Wall((357, 165), 90, 30),
-                    Wall((557, 165), 90, 30),
-                    Wall((633, 0), 300, 300)
-                ],
-                [
-                    VeryBigFish((400, 220), 200, 200, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.3, lungesprite="verybigfish_lunge.png"),
-                    SmallFish((400, 30), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
-                    SmallFish((450, 40), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
-                    SmallFish((500, 50), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
-                    SmallFish((550, 60), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
-                ],
-                900,
-                900,
-                0,
-                text = FONT.render(f"Level 14: Shrink Ray 102!", True, (255, 0, 0)),
-                textpos = (0, 0)
-                )
-
-level14 = Level("14_whichbutton",
-                Character((5, 330), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
-                [
-                    Wall((0, 250), 1, 300),
-                    Wall((0, 0), 360, 300),
-                    Wall((0, 375), 360, 600),
-                    Wall((0, 0), 1, 200),
-                    Wall((631, 375), 300, 600),
-                    Wall((633, 0), 300, 300),
-                    Wall((815, 300), 8, 200)
-                ],
-                [
-                    VeryBigFish((400, -50), 200, 200, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.3, lungesprite="verybigfish_lunge.png"),
-                    SmallFish((400, 0), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
-                    Button((359, 400), 50, 50, (240, 240, 240), None, "lowerwater", newlevel=900, wallind=0),
-                    Button((582, 400), 50, 50, (60, 0, 60), None, "removewall", newlevel=None, wallind=6)
-                ],
-                900,
-                900,
-                0,
-                text = FONT.render(f"Level 15: Buttons final exam, hope you paid attention in 101!", True, (255, 0, 0)),
-                textpos = (0, 0)
-                )
-
-level15 = Level("15_bruh",
-                Character((5, 350), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
-                [
-                    Wall((0, 0), 1, 300),
-                    Wall((0, 0), 900, 300),
-                    Wall((0, 500), 900, 400),
-                ],
-                [   
-                    SmallFish((400, 400), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
+def level13():
+    return Level("13_gun",
+                 Character((5, 330), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
+                 [   
+                     Wall((0, 250), 1, 300),
+                     Wall((0, 0), 360, 300),
+                     Wall((0, 375), 360, 600),
+                     Wall((320, 500), 600, 500),
+                     Wall((0, 0), 1, 200),
+                     Wall((631, 375), 300, 300),
+                     Wall((357, 165), 90, 30),
+                     Wall((557, 165), 90, 30),
+                     Wall((633, 0), 300, 300)
+                 ],
+                 [
+                     VeryBigFish((400, 220), 200, 200, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.3, lungesprite="verybigfish_lunge.png"),
+                     SmallFish((400, 30), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((450, 40), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((500, 50), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
+                     SmallFish((550, 60), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1.5),
+                 ],
+                 900,
+                 900,
+                 0,
+                 text="Level 14: Shrink Ray 102!",
+                 textpos=(0, 0)
+                 )
+
+def level14():
+    return Level("14_whichbutton",
+                 Character((5, 330), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 250), 1, 300),
+                     Wall((0, 0), 360, 300),
+                     Wall((0, 375), 360, 600),
+                     Wall((0, 0), 1, 200),
+                     Wall((631, 375), 300, 600),
+                     Wall((633, 0), 300, 300),
+                     Wall((815, 300), 8, 200)
+                 ],
+                 [
+                     VeryBigFish((400, -50), 200, 200, (200, 105, 0), "verybigfish.png", values=VERYBIGFISHVALS, fishvalues=FISHVALS, speed=.3, lungesprite="verybigfish_lunge.png"),
+                     SmallFish((400, 0), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
+                     Button((359, 400), 50, 50, (240, 240, 240), None, "lowerwater", newlevel=900, wallind=0),
+                     Button((582, 400), 50, 50, (60, 0, 60), None, "removewall", newlevel=None, wallind=6)
+                 ],
+                 900,
+                 900,
+                 0,
+                 text="Level 15: Buttons final exam, hope you paid attention in 101!",
+                 textpos=(0, 0)
+                 )
+
+def level15():
+    return Level("15_bruh",
+                 Character((5, 350), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 0), 1, 300),
+                     Wall((0, 0), 900, 300),
+                     Wall((0, 500), 900, 400),
                  ],
-                900,
-                900,
-                400,
-                text = FONT.render(f"Level 16: Realise the game jam ends in 9th of august not 10", True, (255, 0, 0)),
-                textpos = (0, 300)
-                )
-
-level16 = Level("16_bruh2",
-                Character((5, 350), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
-                [
-                    Wall((0, 0), 1, 300),
-                    Wall((0, 0), 900, 300),
-                    Wall((0, 500), 900, 400),
-                ],
-                [   
-                    SmallFish((400, 400), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
+                 [   
+                     SmallFish((400, 400), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
+                  ],
+                 900,
+                 900,
+                 400,
+                 text="Level 16: Realise the game jam ends in 9th of august not 10",
+                 textpos=(0, 300)
+                 )
+
+def level16():
+    return Level("16_bruh2",
+                 Character((5, 350), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 0), 1, 300),
+                     Wall((0, 0), 900, 300),
+                     Wall((0, 500), 900, 400),
                  ],
-                900,
-                900,
-                400,
-                text = FONT.render(f"Level 17: Realise the game jam ends in 40 minutes holy shit", True, (255, 0, 0)),
-                textpos = (0, 300)
-                )
-
-level17 = Level("17_bruh3",
-                Character((5, 350), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
-                [
-                    Wall((0, 0), 1, 300),
-                    Wall((0, 0), 900, 300),
-                    Wall((0, 500), 900, 400),
-                ],
-                [   
-                    SmallFish((400, 400), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
+                 [   
+                     SmallFish((400, 400), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
+                  ],
+                 900,
+                 900,
+                 400,
+                 text="Level 17: Realise the game jam ends in 40 minutes holy shit",
+                 textpos=(0, 300)
+                 )
+
+def level17():
+    return Level("17_bruh3",
+                 Character((5, 350), 20, 20, PLAYERVALS2, (255, 0, 0), "char.png"),
+                 [
+                     Wall((0, 0), 1, 300),
+                     Wall((0, 0), 900, 300),
+                     Wall((0, 500), 900, 400),
                  ],
-                900,
-                900,
-                400,
-                text = FONT.render(f"Level 18: Realise theres no way to finish this game, add 3 levels explaining your situation and submit", True, (255, 0, 0)),
-                textpos = (0, 300)
-                )
-
-                            
-levellist = [level0, level1, level2, level3, level4, level5, level6, level7, level8, level9, level10, level11, level12, level13, level14, level15, level16, level17]
\ No newline at end of file
+                 [   
+                     SmallFish((400, 400), 20, 20, (0, 0, 255), "smallfish.png", values=FISHVALS, speed=1),
+                  ],
+                 900,
+                 900,
+                 400,
+                 text="Level 18: Realise theres no way to finish this game, add 3 levels explaining your situation and submit",
+                 textpos=(0, 300)
+                 )
+
+levellist = LevelList([level0, level1, level2, level3, level4, level5, level6, level7, level8, level9, level10, level11, level12, level13, level14, level15, level16, level17])
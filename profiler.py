@@ -0,0 +1,106 @@
+"""Where the time of a frame goes, phase by phase (player inputs, fish ai, wall collisions, rendering...)
+
+    python jam.py --profile             # shows the last frames' timings on screen
+    python jam.py --profile run.json    # and saves them when the game closes (.json is a chrome trace, else csv)
+    python headless.py 8 --profile 8.csv
+
+Level.update and Game.render call mark() between their phases, but only when a profiler is active,
+with none active (the default) all that's left is an `if prof:` check per phase
+"""
+import time
+from collections import deque
+
+active: 'Profiler | None' = None
+
+
+def enable(frames=300):
+    global active
+    active = Profiler(frames)
+    return active
+
+
+def disable():
+    global active
+    active = None
+
+
+class Profiler:
+    def __init__(self, frames=300):
+        self.frames = deque(maxlen=frames)  # seconds per phase of each of the last frames
+        self.events = deque(maxlen=frames * 32)  # (phase, start, duration), for the chrome trace
+        self.current = {}
+        self.phase = None
+        self.start = 0
+        self.origin = time.perf_counter()
+        self.count = 0  # frames ever closed
+        self.hud = (-1, [])  # overlay text and the frame it was made on, it's only redone every few frames
+
+    def mark(self, phase):
+        """Ends the running phase (if any) and starts timing phase"""
+        now = time.perf_counter()
+        if self.phase is not None:
+            took = now - self.start
+            self.current[self.phase] = self.current.get(self.phase, 0) + took
+            self.events.append((self.phase, self.start, took))
+        self.phase = phase
+        self.start = now
+
+    def end(self):
+        self.mark(None)
+
+    def frame(self):
+        """Closes the current frame, everything marked since the last call counts towards it"""
+        self.end()
+        self.frames.append(self.current)
+        self.current = {}
+        self.count += 1
+
+    def phases(self):
+        seen = {}
+        for frame in self.frames:
+            for phase in frame:
+                seen[phase] = None
+        return list(seen)
+
+    def summary(self):
+        """phase -> (average, worst) milliseconds over the frames kept"""
+        result = {}
+        n = len(self.frames) or 1
+        for phase in self.phases():
+            times = [frame.get(phase, 0) for frame in self.frames]
+            result[phase] = (sum(times) / n * 1000, max(times) * 1000)
+        return result
+
+    def lines(self, every=30):
+        """(phase, timings) text for the on-screen overlay, worked out again every few frames so it stays readable (and cheap)"""
+        if self.hud[0] >= 0 and self.count - self.hud[0] < every:
+            return self.hud[1]
+        summary = self.summary()
+        total = sum(avg for avg, worst in summary.values())
+        lines = [("frame", f"{total:.2f}ms")]
+        for phase, (avg, worst) in sorted(summary.items(), key=lambda item: -item[1][0]):
+            lines.append((phase, f"{avg:.2f}ms  (max {worst:.2f})"))
+        self.hud = (self.count, lines)
+        return lines
+
+    def write_csv(self, path):
+        phases = self.phases()
+        with open(path, "w") as file:
+            file.write(",".join(["frame"] + phases) + "\n")
+            for i, frame in enumerate(self.frames):
+                file.write(",".join([str(i)] + [f"{frame.get(phase, 0) * 1000:.4f}" for phase in phases]) + "\n")
+
+    def write_trace(self, path):
+        """Saves the phases as a chrome trace, open it in chrome://tracing or ui.perfetto.dev"""
+        import json
+        events = [{"name": phase, "ph": "X", "pid": 0, "tid": 0,
+                   "ts": (start - self.origin) * 1e6, "dur": took * 1e6}
+                  for phase, start, took in self.events]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def save(self, path):
+        if path.endswith(".json"):
+            self.write_trace(path)
+        else:
+            self.write_csv(path)
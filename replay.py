@@ -0,0 +1,168 @@
+"""Records what the player did in a level and plays it back without a window, tick for tick
+
+    python jam.py --record runs           # play normally, every level attempt gets saved in runs/
+    python replay.py runs/*.sfr           # replay them and check they end up exactly where they did when played
+    python replay.py runs/x.sfr -n 100    # replay 100 times as fast as possible and report the speed
+    python replay.py runs/*.sfr --pack mypack.json    # recordings of levels from a level pack
+
+A recording is the seed the level's random numbers were started with (see Level.reseed) followed by
+one record per tick (dt, the buttons held, the mouse position), and the state the level ended in
+so a replay can be checked
+"""
+import os
+if __name__ == "__main__":
+    # the game imports this too, only go windowless when replaying from the command line
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import hashlib
+import random
+import struct
+import time
+import levels
+from inputs import InputFrame
+
+MAGIC = b"SFRP"
+VERSION = 2
+HEADER = struct.Struct("<4sHQhH")  # magic, version, seed, level index, length of the level id after it
+FRAME = struct.Struct("<dBhh")  # dt, buttons, mouse x, mouse y
+END = struct.Struct("<I16s")  # number of frames, digest of the final state
+BUTTONS = ("left", "right", "up", "down", "jump", "shoot", "quit")
+
+
+def pack(frame):
+    buttons = 0
+    for bit, name in enumerate(BUTTONS):
+        if getattr(frame, name):
+            buttons |= 1 << bit
+    return buttons
+
+
+def unpack(buttons, mousepos):
+    return InputFrame(mousepos=mousepos, **{name: bool(buttons >> bit & 1) for bit, name in enumerate(BUTTONS)})
+
+
+def digest(level):
+    """Hash of everything about a level that can change while it's played"""
+    player = level.player
+    state = [level.cleared, level.waterlevel, len(level.walls),
+             player.alive, tuple(player.topleft), tuple(player.v), player.oxygen, player.gun]
+    for obj in level.objects:
+        state.append((type(obj).__name__, tuple(obj.topleft), obj.width, obj.height,
+                      tuple(getattr(obj, "v", ())), getattr(obj, "alive", None),
+                      getattr(obj, "picked", None), getattr(obj, "pressed", None)))
+    return hashlib.md5(repr(state).encode()).digest()
+
+
+class Recorder:
+    """Writes a recording while a level is played, call write() right before every Level.update
+    and close() once the level is over. Reseeds the level itself so the fish do the same thing on replay"""
+    def __init__(self, path, levelindex, level, seed=None):
+        if seed is None:
+            seed = random.randrange(1 << 63)
+        self.seed = seed
+        self.frames = 0
+        self.file = open(path, "wb")
+        levelid = str(level.levelid).encode()
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, levelindex, len(levelid)) + levelid)
+        level.reseed(seed)
+
+    def write(self, dt, frame):
+        x, y = (max(-32768, min(32767, int(c))) for c in frame.mousepos)
+        self.file.write(b"F" + FRAME.pack(dt, pack(frame), x, y))
+        self.frames += 1
+
+    def close(self, level):
+        if self.file.closed:
+            return
+        self.file.write(b"E" + END.pack(self.frames, digest(level)))
+        self.file.close()
+
+
+class Recording:
+    def __init__(self, seed, levelindex, levelid, frames, digest=None):
+        self.seed = seed
+        self.levelindex = levelindex
+        self.levelid = levelid
+        self.frames = frames  # list of (dt, InputFrame)
+        self.digest = digest  # None if the recording was cut off before the level ended
+
+
+def load(path):
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, seed, levelindex, idlength = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a recording")
+    if version != VERSION:
+        raise ValueError(f"{path} is a version {version} recording, this reads version {VERSION}")
+    at = HEADER.size
+    levelid = data[at:at + idlength].decode()
+    at += idlength
+    frames = []
+    end = None
+    while at < len(data):
+        kind = data[at:at + 1]
+        at += 1
+        if kind == b"F" and at + FRAME.size <= len(data):
+            dt, buttons, x, y = FRAME.unpack_from(data, at)
+            frames.append((dt, unpack(buttons, (x, y))))
+            at += FRAME.size
+        elif kind == b"E" and at + END.size <= len(data):
+            count, end = END.unpack_from(data, at)
+            if count != len(frames):
+                raise ValueError(f"{path} should have {count} frames but has {len(frames)}")
+            break
+        else:
+            break  # truncated, the game probably crashed or got killed while recording
+    return Recording(seed, levelindex, levelid, frames, end)
+
+
+def play(recording, levellist=None):
+    """Steps the recorded level through every recorded tick, returns the level"""
+    levellist = levels.levellist if levellist is None else levellist
+    level = levellist[recording.levelindex]
+    if str(level.levelid) != recording.levelid:
+        raise ValueError(f"recorded on {recording.levelid} but level {recording.levelindex} is {level.levelid}")
+    level.reset()
+    level.reseed(recording.seed)
+    for dt, frame in recording.frames:
+        level.update(dt, frame)
+    return level
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded levels headlessly")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("-n", "--times", type=int, default=1, help="replay each file this many times")
+    parser.add_argument("--pack", metavar="PATH", help="the level pack the recordings were made on")
+    args = parser.parse_args()
+    levellist = None
+    if args.pack:
+        import levelfile
+        levellist = levelfile.load(args.pack)
+
+    mismatches = 0
+    for path in args.files:
+        recording = load(path)
+        start = time.perf_counter()
+        for _ in range(args.times):
+            level = play(recording, levellist)
+        took = time.perf_counter() - start
+        if recording.digest is None:
+            result = "no end state recorded"
+        elif digest(level) == recording.digest:
+            result = "matches"
+        else:
+            result = "MISMATCH"
+            mismatches += 1
+        frames = len(recording.frames) * args.times
+        print(f"{path}: {recording.levelid}, {len(recording.frames)} frames, {result}  "
+              f"({frames / took:.0f} frames/s)")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Finds a way through every level by trying inputs on a headless level, to check that they can all be cleared
+
+    python solver.py                     # every level, exits with 1 if one of them couldn't be cleared
+    python solver.py 9 11 -v             # levels 9 and 11, and print the inputs that cleared them
+    python solver.py --record solutions  # save the solutions as recordings, python replay.py solutions/*.sfr plays them
+    python solver.py --pack mypack.json  # the levels of a level pack
+    python solver.py --ci -j 4           # a quick search first and the full one only where that fails, on 4 processes
+
+The search is a breadth first search over level snapshots: every state gets every action (a few ticks of
+holding some keys, or of shooting at the closest fish once there's a gun) tried on it. States are told apart by
+a coarse hash (which cell of a grid the player is in, roughly how it's moving, its oxygen, what's been picked,
+pressed and shrunk), the first time a state is reached is the only one that gets expanded further, and when
+there are too many states at one depth only the ones furthest to the right or closest to a button are kept (the beam)
+the first state that clears the level is the fastest clear this search found, the beam can throw away
+faster ones so it's not necessarily the fastest there is. Since the level is reseeded before solving the fish do the same thing every time the solution is played
+"""
+import os
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import multiprocessing
+import time
+import levels
+from levels import VeryBigFish, TICK
+from inputs import InputFrame
+
+# name: keys held for the whole action, jump only gets pressed on its first tick (like tapping space)
+ACTIONS = {
+    "wait": (),
+    "left": ("left",),
+    "right": ("right",),
+    "up": ("up",),
+    "down": ("down",),
+    "upleft": ("up", "left"),
+    "upright": ("up", "right"),
+    "downleft": ("down", "left"),
+    "downright": ("down", "right"),
+    "jump": ("jump", "up"),
+    "jumpleft": ("jump", "up", "left"),
+    "jumpright": ("jump", "up", "right"),
+}
+SHOOTING = ("shoot", "shootleft", "shootright")  # only tried once the player has the gun
+# (steps, beam) of every search tried on a level until one clears it, --ci uses the quick one first.
+# the quick one clears every built-in level in about a third of the time, but finds slower clears
+FULL = ((6, 400),)
+CI = ((9, 100), (6, 400))
+
+
+class Solution:
+    def __init__(self, levelid, cleared, ticks, actions, frames, states, took):
+        self.levelid = levelid
+        self.cleared = cleared
+        self.ticks = ticks  # ticks until the level was cleared (or searched, if it wasn't)
+        self.actions = actions  # names of the actions taken, one per step
+        self.frames = frames  # the InputFrame of every tick, what a recording of the solution holds
+        self.states = states  # states looked at
+        self.took = took  # seconds spent searching
+        self.replayed = None  # whether playing the solution back cleared the level too, see work
+
+
+def aim(level):
+    """Mouse position right on the closest live fish to the player, None if there are none"""
+    best, bestdist = None, None
+    center = level.player.pg_rect.center
+    for fish in level.fish:
+        dist = fish.topleft.distance_squared_to(level.player.topleft)
+        if bestdist is None or dist < bestdist:
+            best, bestdist = fish, dist
+    if best is None:
+        return None
+    return best.pg_rect.center if best.pg_rect.center != center else None
+
+
+def frames_for(level, name, steps):
+    """The InputFrames of one action, worked out from the state the level is in when it starts"""
+    if name in SHOOTING:
+        target = aim(level)
+        move = name[len("shoot"):]
+        held = {move: True} if move else {}
+        first = rest = InputFrame(shoot=True, mousepos=target, **held)
+        return [first] + [rest] * (steps - 1)
+    keys = ACTIONS[name]
+    rest = InputFrame(**{key: True for key in keys if key != "jump"})
+    first = InputFrame(**{key: True for key in keys}) if "jump" in keys else rest
+    return [first] + [rest] * (steps - 1)
+
+
+def statekey(level, cell):
+    """Coarse description of a state, states with the same key count as the same"""
+    p = level.player
+    return (int(p.topleft.x // cell), int(p.topleft.y // cell), round(p.v.x / 2), round(p.v.y / 2),
+            p.can_jump, p.gun, int(p.oxygen // 200), level.waterlevel, len(level.walls), len(level.live),
+            sum(fish.width for fish in level.species[VeryBigFish]) // 20)
+
+
+def situation(level):
+    """What the player has done to the level so far (water moved, walls gone, gun picked, fish shrunk)
+    and whether it's under water, where it can drown"""
+    return level.waterlevel, len(level.walls), level.player.gun, len(level.live), level.player.water > 0.9
+
+
+def progress(level):
+    """How far right the player is and how close it is to the closest unpressed button (negated, so more is better)"""
+    center = level.player.pg_rect.center
+    closest = min((button.topleft.distance_to(center) for button in level.buttons), default=0)
+    return level.player.topleft.x, -closest
+
+
+def prune(states, beam):
+    """At most beam of states, split evenly between the situations they're in so that a state that pressed
+    a button doesn't get crowded out by ones that are further right but haven't. In each situation the states
+    furthest right and the ones closest to a button take turns, buttons are often out of the way"""
+    if len(states) <= beam:
+        return states
+    groups = {}
+    for state in states:
+        groups.setdefault(state[1], []).append(state)
+    kept, taken = [], set()
+    share = max(1, beam // len(groups))
+    for group in groups.values():
+        right = sorted(group, key=lambda state: -state[0][0])
+        button = sorted(group, key=lambda state: -state[0][1])
+        count = 0
+        for state in (state for pair in zip(right, button) for state in pair):
+            if count == share:
+                break
+            if state[2] not in taken:
+                taken.add(state[2])
+                kept.append(state)
+                count += 1
+    rest = sorted((state for state in states if state[2] not in taken), key=lambda state: -state[0][0])
+    return kept + rest[:beam - len(kept)]
+
+
+def solve(level, seed=0, steps=6, beam=400, seconds=60, cell=8):
+    """Searches for the fastest way to clear level, trying each action for steps ticks at a time
+    and giving up after seconds of game time"""
+    start = time.perf_counter()
+    level.reset()
+    level.reseed(seed)
+    root = level.snapshot()
+    seen = {statekey(level, cell)}  # states that made it into a frontier, reaching one of them again is no use
+    frontier = [(root, None)]  # (snapshot, (parent, action, frames)) for every state at this depth
+    depth, states = 0, 0
+    found = None
+    while frontier and depth * steps * TICK < seconds and found is None:
+        depth += 1
+        nextfrontier = {}
+        for snapshot, node in frontier:
+            level.restore(snapshot)
+            names = list(ACTIONS) + (list(SHOOTING) if level.player.gun and level.fish else [])
+            for i, name in enumerate(names):
+                if i:
+                    level.restore(snapshot)
+                frames = frames_for(level, name, steps)
+                if frames[0].shoot and frames[0].mousepos is None:
+                    continue
+                for tick, frame in enumerate(frames):
+                    level.update(TICK, frame)
+                    if level.cleared or not level.player.alive:
+                        frames = frames[:tick + 1]
+                        break
+                states += 1
+                if level.cleared:
+                    found = ((node, name, frames), (depth - 1) * steps + len(frames))
+                    break
+                if not level.player.alive:
+                    continue
+                key = statekey(level, cell)
+                if key in seen or key in nextfrontier:
+                    continue
+                nextfrontier[key] = (progress(level), situation(level), key, level.snapshot(), (node, name, frames))
+            if found is not None:
+                break
+        kept = prune(list(nextfrontier.values()), beam)
+        seen.update(key for score, where, key, snapshot, node in kept)
+        frontier = [(snapshot, node) for score, where, key, snapshot, node in kept]
+
+    took = time.perf_counter() - start
+    if found is None:
+        return Solution(level.levelid, False, depth * steps, [], [], states, took)
+    node, ticks = found
+    actions, frames = [], []
+    while node is not None:
+        node, name, nodeframes = node
+        actions.append(name)
+        frames[:0] = nodeframes
+    actions.reverse()
+    return Solution(level.levelid, True, ticks, actions, frames, states, took)
+
+
+def check(level, solution, seed=0):
+    """Plays a solution back from the start, True if it still clears the level"""
+    level.reset()
+    level.reseed(seed)
+    for frame in solution.frames:
+        level.update(TICK, frame)
+    return level.cleared
+
+
+def record(path, levelindex, level, solution, seed=0):
+    import replay
+    level.reset()
+    recorder = replay.Recorder(path, levelindex, level, seed)
+    for frame in solution.frames:
+        recorder.write(TICK, frame)
+        level.update(TICK, frame)
+    recorder.close(level)
+
+
+_levellists = {}
+
+
+def work(task):
+    """Solves one level with every search in tries until one clears it, checks the solution plays back
+    and records it, in a worker process (or not, with one process)"""
+    i, pack, tries, seconds, seed, folder = task
+    levellist = _levellists.get(pack)
+    if levellist is None:
+        if pack:
+            import levelfile
+            levellist = _levellists[pack] = levelfile.load(pack)
+        else:
+            levellist = _levellists[pack] = levels.levellist
+    level = levellist[i]
+    states = took = 0
+    for steps, beam in tries:
+        solution = solve(level, seed, steps, beam, seconds)
+        states += solution.states
+        took += solution.took
+        if solution.cleared:
+            break
+    solution.states, solution.took = states, took
+    if solution.cleared:
+        solution.replayed = check(level, solution, seed)
+        if solution.replayed and folder:
+            record(os.path.join(folder, f"{solution.levelid}.sfr"), i, level, solution, seed)
+    levellist.release(i)
+    return solution
+
+
+def compact(actions):
+    """right right right jump -> right x3, jump"""
+    runs = []
+    for name in actions:
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ", ".join(name if count == 1 else f"{name} x{count}" for name, count in runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that levels can be cleared by searching for a solution")
+    parser.add_argument("levels", nargs="*", type=int, help="level indexes, all of them if none are given")
+    parser.add_argument("--pack", metavar="PATH", help="solve the levels of a level pack (see levelfile.py)")
+    parser.add_argument("-s", "--steps", type=int, default=FULL[0][0], help="ticks every action is held for")
+    parser.add_argument("-b", "--beam", type=int, default=FULL[0][1], help="states kept at every depth")
+    parser.add_argument("--ci", action="store_true",
+                        help="try a quicker search first and the full one only on levels it doesn't clear "
+                             "(ignores --steps and --beam)")
+    parser.add_argument("--seconds", type=float, default=60, help="game time to search before giving up on a level")
+    parser.add_argument("--seed", type=int, default=0, help="seed the fish get before solving")
+    parser.add_argument("--record", metavar="FOLDER", help="save every solution as a recording in FOLDER")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="levels solved at once, one per core by default")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the actions of every solution")
+    args = parser.parse_args()
+    if args.pack:
+        import levelfile
+        count = len(levelfile.load(args.pack))
+    else:
+        count = len(levels.levellist)
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    tries = CI if args.ci else ((args.steps, args.beam),)
+    tasks = [(i, args.pack, tries, args.seconds, args.seed, args.record) for i in args.levels or range(count)]
+
+    unsolved = 0
+    start = time.perf_counter()
+    processes = args.processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) == 1:
+        solutions = map(work, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(processes, len(tasks)))
+        # one level at a time, some take far longer than others
+        solutions = pool.imap_unordered(work, tasks, chunksize=1)
+    for solution in solutions:
+        if solution.cleared and not solution.replayed:
+            print(f"{solution.levelid}: the solution found doesn't clear the level when played back")
+            solution.cleared = False
+        if solution.cleared:
+            print(f"{solution.levelid:<22} fastest found {solution.ticks * TICK:6.2f}s ({solution.ticks} ticks)   "
+                  f"{solution.states:>7} states in {solution.took:.2f}s")
+            if args.verbose:
+                print(f"    {compact(solution.actions)}")
+        else:
+            unsolved += 1
+            print(f"{solution.levelid:<22} NOT CLEARED after {solution.ticks * TICK:.0f}s of game time   "
+                  f"{solution.states:>7} states in {solution.took:.2f}s")
+    if pool is not None:
+        pool.close()
+        pool.join()
+    print(f"{len(tasks) - unsolved}/{len(tasks)} levels cleared in {time.perf_counter() - start:.2f}s "
+          f"on {min(processes, len(tasks))} processes")
+    if unsolved:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
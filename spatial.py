@@ -0,0 +1,171 @@
+import math
+import pygame as pg
+
+
+def cliphit(rect, start, end):
+    """Squared distance from start to the closest point where the segment start-end touches rect and that point,
+    None if it doesn't touch it"""
+    clip = rect.clipline(start, end)
+    if not clip:
+        return None
+    d0 = start.distance_squared_to(clip[0])
+    d1 = start.distance_squared_to(clip[1])
+    if d1 < d0:
+        return d1, clip[1]
+    return d0, clip[0]
+
+
+class Grid:
+    """Uniform grid over rects, every item goes in all the cells its rect touches
+    so lookups only have to look at the few items that are actually nearby"""
+    def __init__(self, cellsize=64):
+        self.cellsize = cellsize
+        self.clear()
+
+    def clear(self):
+        self.cells: dict[tuple[int, int], list[int]] = {}
+        self.items = []  # items in insertion order, cells hold indexes into this list
+        self.maxwidth = 0  # widest rect inserted
+        self.bounds = None  # (min cell x, min cell y, max cell x, max cell y)
+
+    def __len__(self):
+        return len(self.items)
+
+    def cellrange(self, rect):
+        cs = self.cellsize
+        return (math.floor(rect[0] / cs), math.floor(rect[1] / cs),
+                math.floor((rect[0] + max(rect[2] - 1, 0)) / cs), math.floor((rect[1] + max(rect[3] - 1, 0)) / cs))
+
+    def insert(self, item, rect):
+        i = len(self.items)
+        self.items.append(item)
+        x0, y0, x1, y1 = self.cellrange(rect)
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = [i]
+                else:
+                    cell.append(i)
+        if rect[2] > self.maxwidth:
+            self.maxwidth = rect[2]
+        if self.bounds is None:
+            self.bounds = (x0, y0, x1, y1)
+        else:
+            bx0, by0, bx1, by1 = self.bounds
+            self.bounds = (min(bx0, x0), min(by0, y0), max(bx1, x1), max(by1, y1))
+        return i
+
+    def query(self, rect):
+        """Indexes of every item whose cells overlap rect, in insertion order"""
+        x0, y0, x1, y1 = self.cellrange(rect)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            return cells.get((x0, y0), ())
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+        return sorted(found)
+
+    def ring(self, cx, cy, k):
+        if k == 0:
+            yield cx, cy
+            return
+        for dx in range(-k, k + 1):
+            yield cx + dx, cy - k
+            yield cx + dx, cy + k
+        for dy in range(-k + 1, k):
+            yield cx - k, cy + dy
+            yield cx + k, cy + dy
+
+    def nearest(self, pos, radius, accept):
+        """Closest item to pos (measured to the item's topleft) that accept(item) is True for,
+        searching outwards ring by ring and stopping as soon as nothing further out can be closer
+        returns (item, distance), or (None, inf) if there's nothing within radius
+        ties go to the item inserted first, like a plain scan over the list would"""
+        if self.bounds is None:
+            return None, math.inf
+        cs = self.cellsize
+        cx, cy = math.floor(pos[0] / cs), math.floor(pos[1] / cs)
+        bx0, by0, bx1, by1 = self.bounds
+        best, bestdist, bestindex = None, math.inf, -1
+        seen = set()
+        k = 0
+        while True:
+            # everything not looked at yet is at least (k - 1) cells away
+            reach = (k - 1) * cs
+            if reach > radius or bestdist < reach:
+                break
+            if cx - k < bx0 and cx + k > bx1 and cy - k < by0 and cy + k > by1:
+                break
+            for cell in self.ring(cx, cy, k):
+                indexes = self.cells.get(cell)
+                if indexes is None:
+                    continue
+                for i in indexes:
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    item = self.items[i]
+                    if not accept(item):
+                        continue
+                    dist = pos.distance_to(item.topleft)
+                    if dist < bestdist or (dist == bestdist and i < bestindex):
+                        best, bestdist, bestindex = item, dist, i
+            k += 1
+        if bestdist > radius:
+            return None, math.inf
+        return best, bestdist
+
+    def raycast(self, start, end, rectof, accept=None):
+        """First item the segment from start to end runs into, walking the cells along the segment in order
+        and stopping once nothing in a later cell could be hit sooner
+        rectof(item) gives the rect to test, returns (squared distance, point, item) or None"""
+        if self.bounds is None:
+            return None
+        cs = self.cellsize
+        bx0, by0, bx1, by1 = self.bounds
+        # only walk the part of the segment that's over the grid at all
+        box = pg.Rect((bx0 - 1) * cs, (by0 - 1) * cs, (bx1 - bx0 + 3) * cs, (by1 - by0 + 3) * cs)
+        clip = box.clipline(start, end)
+        if not clip:
+            return None
+        (x, y), (ex, ey) = clip
+        dx, dy = ex - x, ey - y
+        cx, cy = math.floor(x / cs), math.floor(y / cs)
+        endcx, endcy = math.floor(ex / cs), math.floor(ey / cs)
+        stepx = 1 if dx > 0 else -1
+        stepy = 1 if dy > 0 else -1
+        # how far along the segment (0 to 1) the next cell border is, and how far apart the borders are
+        tx = ((cx + (dx > 0)) * cs - x) / dx if dx else math.inf
+        ty = ((cy + (dy > 0)) * cs - y) / dy if dy else math.inf
+        deltax = cs / abs(dx) if dx else math.inf
+        deltay = cs / abs(dy) if dy else math.inf
+
+        best, bestindex = None, -1
+        seen = set()
+        for _ in range(abs(endcx - cx) + abs(endcy - cy) + 1):
+            for i in self.cells.get((cx, cy), ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                item = self.items[i]
+                if accept is not None and not accept(item):
+                    continue
+                hit = cliphit(rectof(item), start, end)
+                if hit is not None and (best is None or hit[0] < best[0] or (hit[0] == best[0] and i < bestindex)):
+                    best, bestindex = (hit[0], hit[1], item), i
+            texit = min(tx, ty)
+            if best is not None and best[0] <= start.distance_squared_to((x + dx * texit, y + dy * texit)):
+                break
+            if tx < ty:
+                cx += stepx
+                tx += deltax
+            else:
+                cy += stepy
+                ty += deltay
+        return best
@@ -0,0 +1,268 @@
+"""Optional numpy engine for the fish, keeps every fish of a level in flat arrays and runs
+their AI, oxygen, wall bouncing and movement for all of them at once instead of one Fish.alg call per fish
+
+The Fish objects are still there (for the renderer, the shrink ray and player collisions), they just get
+their state written back once per tick. Use it through Level.use_swarm()"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import pygame as pg
+from levels import TICK
+
+SMALL, BIG, VERYBIG = 0, 1, 2
+LUNGECOLOR = (200, 20, 0)
+CHUNK = 1 << 18  # max number of predator-prey distances worked out at once
+
+
+class FishSwarm:
+    def __init__(self, fishes=(), seed=None):
+        if np is None:
+            raise ImportError("the swarm fish engine needs numpy")
+        self.rng = np.random.default_rng(seed)
+        self.load(fishes)
+
+    def load(self, fishes):
+        """(Re)builds the arrays from Fish objects, needed whenever fish are added or changed from outside"""
+        from levels import BigFish, VeryBigFish
+        self.fishes = list(fishes)
+        n = len(self.fishes)
+        f = self.fishes
+
+        self.species = np.array([VERYBIG if isinstance(o, VeryBigFish) else BIG if isinstance(o, BigFish) else SMALL
+                                 for o in f], dtype=np.int8).reshape(n)
+        self.pos = np.array([(o.topleft.x, o.topleft.y) for o in f], dtype=float).reshape(n, 2)
+        self.v = np.array([(o.v.x, o.v.y) for o in f], dtype=float).reshape(n, 2)
+        self.size = np.array([(int(o.width), int(o.height)) for o in f], dtype=float).reshape(n, 2)
+        self.halfwidth = np.array([o.width / 2 for o in f], dtype=float)
+        self.alive = np.array([o.alive for o in f], dtype=bool).reshape(n)
+        self.spriteindex = np.array([o.spriteindex for o in f], dtype=np.int8).reshape(n)
+
+        self.speed = np.array([o.speed for o in f], dtype=float)
+        self.fastspeed = np.array([o.fastspeed for o in f], dtype=float)
+        self.rushspeed = np.array([o.rushspeed for o in f], dtype=float)
+        self.small_range = np.array([o.small_range for o in f], dtype=float)
+        self.big_range = np.array([o.big_range for o in f], dtype=float)
+
+        self.gravity = np.array([o.params.gravity for o in f], dtype=float)
+        self.airdrag = np.array([o.params.airdrag for o in f], dtype=float)
+        self.oxygen = np.array([o.oxygen for o in f], dtype=float)
+        self.maxoxygen = np.array([o.params.maxoxygen for o in f], dtype=float)
+        self.o2loss = np.array([o.params.o2loss for o in f], dtype=float)
+
+        # only the very big fish lunge, the others just carry zeros
+        self.lungedistance = np.array([getattr(o, "lungedistance", 0) for o in f], dtype=float)
+        self.lunge_timer = np.array([getattr(o, "lunge_timer", 0) for o in f], dtype=float)
+        self.lunge_telegraph = np.array([getattr(o.params, "lunge_telegraph", 1) for o in f], dtype=float)
+        self.lunge_duration = np.array([getattr(o.params, "lunge_duration", 0) for o in f], dtype=float)
+        self.color = np.array([tuple(o.color)[:3] for o in f], dtype=float).reshape(n, 3)
+        self.startcolor = np.array([tuple(o.startcolor)[:3] for o in f], dtype=float).reshape(n, 3)
+
+    def __len__(self):
+        return len(self.fishes)
+
+    def think(self, level, dt):
+        """One tick of AI and wall bouncing for every fish, same rules as the alg() methods in levels.py"""
+        if not self.fishes:
+            return
+        pos, v, alive, species = self.pos, self.v, self.alive, self.species
+        wasalive = alive.copy()
+
+        self.spriteindex[(species == BIG) | ((species == VERYBIG) & alive)] = 0
+
+        # out of the water: fall and suffocate
+        air = alive & (pos[:, 1] <= level.waterlevel)
+        water = alive & ~air
+        v[air, 1] += self.gravity[air] * dt
+        rising = air & (v[:, 1] < 0)
+        v[rising] *= (1 - self.airdrag[rising] * dt)[:, None]
+        self.oxygen[air] -= self.o2loss[air] * dt
+        alive[air & (self.oxygen <= 0)] = False
+
+        breathing = water & (self.oxygen < self.maxoxygen)
+        self.oxygen[breathing] += self.o2loss[breathing] * 2 * dt
+
+        wander = water.copy()
+        player = level.player
+        away = pos - (player.topleft.x, player.topleft.y)
+        dist = np.hypot(away[:, 0], away[:, 1])
+        away /= np.where(dist == 0, 1, dist)[:, None]
+
+        # small fish run away from the player
+        small = water & (species == SMALL)
+        rush = small & (dist < self.small_range)
+        fast = small & ~rush & (dist < self.big_range)
+        v[rush] = away[rush] * self.rushspeed[rush, None]
+        v[fast] = away[fast] * self.fastspeed[fast, None]
+        wander &= ~(rush | fast)
+
+        # very big fish go for the player when it's in the water and close enough
+        verybig = water & (species == VERYBIG)
+        if player.water > 0:
+            hunting = verybig & (dist < self.big_range)
+        else:
+            hunting = np.zeros_like(verybig)
+        approach = hunting & (dist > self.lungedistance)
+        self.spriteindex[approach] = 0
+        self.lunge_timer[approach] = self.lunge_telegraph[approach]
+        self.color[approach] = self.startcolor[approach]
+        v[approach] = -away[approach] * (self.speed[approach] * 2)[:, None]
+        self.lunge(np.flatnonzero(hunting & ~approach), -away, dt)
+        wander &= ~hunting
+
+        # and everything bigger than a small fish eats whatever smaller fish is closest
+        eaten = []
+        self.hunt(np.flatnonzero((water & (species == BIG)) | (verybig & ~hunting)), wander, eaten)
+
+        self.wander(np.flatnonzero(wander), dt)
+        v[eaten] = 0
+        self.bounce(level, dt)
+
+        # deaths have to show up on the objects right away, the player can't be killed by a dead fish
+        for i in np.flatnonzero(wasalive & ~alive).tolist():
+            level.kill(self.fishes[i])
+
+    def nearest(self, predators, prey):
+        """Index of and distance to the closest prey of every predator"""
+        px, py = self.pos[prey, 0], self.pos[prey, 1]
+        cx, cy = self.pos[predators, 0, None], self.pos[predators, 1, None]
+        closest = np.empty(len(predators), dtype=np.intp)
+        closestdist = np.empty(len(predators))
+        rows = max(1, CHUNK // len(prey))
+        for start in range(0, len(predators), rows):
+            end = start + rows
+            dx = px - cx[start:end]
+            dy = py - cy[start:end]
+            d = dx * dx
+            d += dy * dy
+            best = d.argmin(axis=1)
+            closest[start:end] = prey[best]
+            closestdist[start:end] = np.sqrt(d[np.arange(len(best)), best])
+        return closest, closestdist
+
+    def preyfor(self, predator):
+        # big fish only eat small fish, very big fish eat both
+        if self.species[predator] == BIG:
+            return np.flatnonzero(self.alive & (self.species == SMALL))
+        return np.flatnonzero(self.alive & (self.species != VERYBIG))
+
+    def hunt(self, predators, wander, eaten):
+        if not len(predators):
+            return
+        pos, v, alive, species = self.pos, self.v, self.alive, self.species
+        closest = np.full(len(predators), -1, dtype=np.intp)
+        closestdist = np.full(len(predators), np.inf)
+        isbig = species[predators] == BIG
+        for group in (isbig, ~isbig):
+            prey = self.preyfor(predators[group][0]) if group.any() else ()
+            if len(prey):
+                closest[group], closestdist[group] = self.nearest(predators[group], prey)
+        found = closest >= 0
+        eat = found & (closestdist < self.halfwidth[predators] + self.halfwidth[closest])
+
+        # fish get eaten one at a time in list order, so some predators find their prey (or themselves) gone
+        # by the time it's their turn, only those few get looked at one by one
+        targets = closest[eat]
+        for k in np.flatnonzero(eat | np.isin(closest, targets) | np.isin(predators, targets)).tolist():
+            i, j = predators[k], closest[k]
+            if not alive[i]:
+                closest[k], eat[k] = -1, False
+                wander[i] = False
+                continue
+            if j >= 0 and not alive[j]:
+                prey = self.preyfor(i)
+                if not len(prey):
+                    closest[k], eat[k] = -1, False
+                    continue
+                c, d = self.nearest(predators[k:k + 1], prey)
+                j = closest[k] = c[0]
+                closestdist[k] = d[0]
+                eat[k] = d[0] < self.halfwidth[i] + self.halfwidth[j]
+            if eat[k]:
+                alive[j] = False
+                eaten.append(j)
+                # a fish that comes after its predator in the list never got to think this tick
+                if j > i:
+                    wander[j] = False
+                if species[i] == BIG:
+                    wander[i] = False
+
+        chasing = (closest >= 0) & ~eat
+        predators, closest, closestdist = predators[chasing], closest[chasing], closestdist[chasing]
+        toward = pos[closest] - pos[predators]
+        toward /= np.where(closestdist == 0, 1, closestdist)[:, None]
+        rush = closestdist < self.small_range[predators]
+        fast = ~rush & (closestdist < self.big_range[predators])
+        r, f = predators[rush], predators[fast]
+        self.spriteindex[r] = 1
+        v[r] = toward[rush] * self.rushspeed[r, None]
+        v[f] = toward[fast] * self.fastspeed[f, None]
+        wander[r] = False
+        wander[f] = False
+
+    def lunge(self, idx, toward, dt):
+        if not len(idx):
+            return
+        timer = self.lunge_timer[idx]
+        telegraph = self.lunge_telegraph[idx]
+        go = timer <= 0.1
+        windup = ~go & (timer <= telegraph)
+        g, w = idx[go], idx[windup]
+        self.spriteindex[idx] = 1
+        self.spriteindex[w] = 0
+        self.lunge_timer[g] = self.lunge_telegraph[g] + self.lunge_duration[g]
+        self.color[g] = self.startcolor[g]
+        self.v[g] = toward[g] * (self.speed[g] * 8)[:, None]
+        self.v[w] = toward[w] * (self.speed[w] * 0.01)[:, None]
+
+        self.lunge_timer[idx] -= dt
+        self.color[idx] += (np.array(LUNGECOLOR) - self.startcolor[idx]) * (dt / telegraph)[:, None]
+        done = (self.color[idx, 0] > 230) | (self.color[idx, 1] < 10)
+        self.color[idx[done]] = LUNGECOLOR
+
+    def wander(self, idx, dt):
+        if not len(idx):
+            return
+        s = self.speed[idx, None]
+        v = self.v[idx] + (self.rng.random((len(idx), 2)) * (s / 2) - s / 4) * (dt / TICK)
+        length = np.hypot(v[:, 0], v[:, 1])
+        moving = length != 0
+        v[moving] *= (s[moving, 0] / length[moving])[:, None]
+        self.v[idx] = v
+
+    def bounce(self, level, dt):
+        """Flips the velocity of every fish that would move into a wall next tick"""
+        if not level.wallrects:
+            return
+        walls = np.array([tuple(rect) for rect in level.wallrects], dtype=float)
+        wx, wy, ww, wh = (walls[:, k] for k in range(4))
+        step = self.v * (dt / TICK)
+        w, h = self.size[:, 0:1], self.size[:, 1:2]
+        # pg.Rect truncates its coordinates
+        x, y = np.trunc(self.pos[:, 0:1]), np.trunc(self.pos[:, 1:2])
+        nx, ny = np.trunc(self.pos[:, 0:1] + step[:, 0:1]), np.trunc(self.pos[:, 1:2] + step[:, 1:2])
+        solid = (w > 0) & (h > 0)
+        xhit = ((nx < wx + ww) & (wx < nx + w) & (y < wy + wh) & (wy < y + h)).any(axis=1) & solid[:, 0]
+        yhit = ((x < wx + ww) & (wx < x + w) & (ny < wy + wh) & (wy < ny + h)).any(axis=1) & solid[:, 0]
+        self.v[xhit, 0] *= -1
+        self.v[yhit, 1] *= -1
+
+    def move(self, dt):
+        """Moves every fish and writes the new state back onto the Fish objects"""
+        if not self.fishes:
+            return
+        # dead fish stay where they died, like on the object path
+        alive = self.alive
+        self.pos[alive] += self.v[alive] * (dt / TICK)
+        pos, v = self.pos.tolist(), self.v.tolist()
+        alive, oxygen, spriteindex = self.alive.tolist(), self.oxygen.tolist(), self.spriteindex.tolist()
+        for i, fish in enumerate(self.fishes):
+            fish.move(pos[i])
+            fish.v.update(v[i])
+            fish.alive = alive[i]
+            fish.oxygen = oxygen[i]
+            fish.spriteindex = spriteindex[i]
+        for i in np.flatnonzero(self.species == VERYBIG).tolist():
+            self.fishes[i].lunge_timer = float(self.lunge_timer[i])
+            self.fishes[i].color = pg.Vector3(self.color[i].tolist())
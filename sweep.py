@@ -0,0 +1,227 @@
+"""Plays levels headlessly under many sets of parameters at once, spread over every core, to tune them
+
+    python sweep.py 9 10 --set PLAYERVALS.jump=12,15,18 --set PLAYERVALS.airdrag=0.9,1.2   # 6 sets on 2 levels
+    python sweep.py --replay runs/*.sfr --set VERYBIGFISHVALS.lunge_telegraph=0.5,1,1.5   # on recorded attempts
+    python sweep.py 3 4 5 --script hop --seeds 20 --set FISHVALS.gravity=25,50 --csv fish.csv
+    python sweep.py --pack mypack.json --set PLAYERVALS.speed=40,50,60
+
+Every combination of the --set values is a parameter set, and every parameter set gets played on every level
+with every seed, one job per process at a time. A parameter is TABLE.name, TABLE being one of the values tables
+in levels.py, and only that table changes (PLAYERVALS.jump doesn't touch PLAYERVALS2, the player of the gun levels)
+The inputs are either a recording (which says what level and seed it was made on) or one of the SCRIPTS
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import time
+import levels
+import replay
+from levels import TICK
+from inputs import InputFrame, NOINPUT
+
+TABLES = ("PLAYERVALS", "PLAYERVALS2", "FISHVALS", "VERYBIGFISHVALS", "GUNVALS")
+RIGHT = InputFrame(right=True)
+HOP = InputFrame(right=True, up=True, jump=True)
+
+
+def idle(level, tick):
+    return NOINPUT
+
+
+def right(level, tick):
+    return RIGHT
+
+
+def hop(level, tick):
+    """Holds right and jumps whenever it can"""
+    return HOP if level.player.can_jump else RIGHT
+
+
+# name: f(level, tick) -> InputFrame, module level functions so the workers can be sent them
+SCRIPTS = {"idle": idle, "right": right, "hop": hop}
+
+
+class Job:
+    def __init__(self, params, levelindex, seed, inputs, frames, pack=None):
+        self.params = params  # ((table, name, value), ...)
+        self.levelindex = levelindex
+        self.seed = seed
+        self.inputs = inputs  # name of a script or path of a recording
+        self.frames = frames  # ticks a script gets before giving up, recordings run until they end
+        self.pack = pack
+
+
+class Result:
+    def __init__(self, job, levelid, cleared, died, ticks, oxygen, took):
+        self.job = job
+        self.levelid = levelid
+        self.cleared = cleared
+        self.died = died
+        self.ticks = ticks  # ticks played, until the level was cleared if it was
+        self.oxygen = oxygen  # lowest oxygen the player had
+        self.took = took  # seconds the job took
+
+
+def grid(axes):
+    """Every combination of axes {(table, name): [values]}, as ((table, name, value), ...)"""
+    keys = list(axes)
+    return [tuple((table, name, value) for (table, name), value in zip(keys, values))
+            for values in itertools.product(*(axes[key] for key in keys))]
+
+
+def parse(setting):
+    """PLAYERVALS.jump=12,15,18 -> ("PLAYERVALS", "jump"), [12, 15, 18]"""
+    target, _, values = setting.partition("=")
+    table, _, name = target.partition(".")
+    if table not in TABLES:
+        raise ValueError(f"{table} is not one of {', '.join(TABLES)}")
+    if name not in getattr(levels, table):
+        raise ValueError(f"{table} has no {name!r}, it has {', '.join(getattr(levels, table))}")
+    if not values:
+        raise ValueError(f"no values given for {target}")
+    return (table, name), [int(value) if value.lstrip("-").isdigit() else float(value) for value in values.split(",")]
+
+
+_levellists = {}
+_recordings = {}
+
+
+def run(job):
+    """Builds a fresh copy of the level with the job's parameters and plays it, in a worker process"""
+    start = time.perf_counter()
+    recording = None
+    if job.inputs in SCRIPTS:
+        script = SCRIPTS[job.inputs]
+    else:
+        recording = _recordings.get(job.inputs)
+        if recording is None:
+            recording = _recordings[job.inputs] = replay.load(job.inputs)
+    levellist = _levellists.get(job.pack)
+    if levellist is None:
+        if job.pack:
+            import levelfile
+            levellist = _levellists[job.pack] = levelfile.load(job.pack)
+        else:
+            levellist = _levellists[job.pack] = levels.levellist
+
+    # the level reads the tables while it's built and while it's played (fish the shrink ray spawns),
+    # a worker only plays one job at a time so they can be changed in place for as long as it takes
+    tables = {table: getattr(levels, table) for table, name, value in job.params}
+    saved = {table: values.copy() for table, values in tables.items()}
+    try:
+        for table, name, value in job.params:
+            tables[table][name] = value
+        level = levellist.factories[job.levelindex]()
+        level.reseed(job.seed if recording is None else recording.seed)
+        player = level.player
+        oxygen = player.oxygen
+        ticks = 0
+        steps = recording.frames if recording is not None else ((TICK, None) for _ in range(job.frames))
+        for dt, frame in steps:
+            level.update(dt, frame if recording is not None else script(level, ticks))
+            ticks += 1
+            oxygen = min(oxygen, player.oxygen)
+            if level.cleared or not player.alive:
+                break
+    finally:
+        for table, values in tables.items():
+            values.clear()
+            values.update(saved[table])
+    return Result(job, level.levelid, level.cleared, not player.alive, ticks, oxygen, time.perf_counter() - start)
+
+
+def sweep(sets, jobs, processes=None):
+    """Plays every job under every parameter set in sets (see grid), jobs being (levelindex, seed, inputs, frames,
+    pack) tuples, on a pool of processes (one per core by default), returns the results in no particular order"""
+    work = [Job(params, *job) for params in sets for job in jobs]
+    if processes == 1:
+        return [run(job) for job in work]
+    with multiprocessing.Pool(processes) as pool:
+        # one job at a time, they take very different amounts of time so big chunks would leave cores idle
+        return list(pool.imap_unordered(run, work, chunksize=1))
+
+
+def table(results):
+    """One row per parameter set and level: runs, clears, deaths, clear times and the lowest oxygen"""
+    rows = {}
+    for result in results:
+        key = (result.job.params, result.job.levelindex)
+        rows.setdefault(key, []).append(result)
+    out = []
+    for (params, levelindex), group in sorted(rows.items(), key=lambda item: (item[0][1], item[0][0])):
+        clears = [result.ticks * TICK for result in group if result.cleared]
+        row = {"level": group[0].levelid}
+        row.update({f"{t}.{n}": v for t, n, v in params})
+        row.update({"runs": len(group), "clears": len(clears), "deaths": sum(result.died for result in group),
+                    "best_clear": min(clears) if clears else None,
+                    "mean_clear": sum(clears) / len(clears) if clears else None,
+                    "min_oxygen": min(result.oxygen for result in group)})
+        out.append(row)
+    return out
+
+
+def show(table):
+    if not table:
+        return
+    columns = list(table[0])
+    cells = [columns]
+    for row in table:
+        cells.append(["-" if row[c] is None else f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c])
+                      for c in columns])
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    for line in cells:
+        print("  ".join(cell.rjust(width) if i else cell.ljust(width) for i, (cell, width) in enumerate(zip(line, widths))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play levels under every combination of some parameters")
+    parser.add_argument("levels", nargs="*", type=int, help="level indexes, all of them if none are given")
+    parser.add_argument("--set", action="append", default=[], metavar="TABLE.name=a,b,c",
+                        help="values to try for a parameter, can be given more than once")
+    parser.add_argument("--replay", nargs="+", metavar="FILE", help="play these recordings instead of a script")
+    parser.add_argument("--script", choices=SCRIPTS, default="hop", help="inputs when there are no recordings")
+    parser.add_argument("--seeds", type=int, default=1, help="play every level with this many seeds (scripts only)")
+    parser.add_argument("-f", "--frames", type=int, default=60 * levels.FPS, help="ticks a script gets on a level")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="worker processes, one per core by default")
+    parser.add_argument("--pack", metavar="PATH", help="the levels of a level pack (see levelfile.py)")
+    parser.add_argument("--csv", metavar="PATH", help="also save the table here")
+    args = parser.parse_args()
+    try:
+        axes = dict(parse(setting) for setting in args.set)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.replay:
+        jobs = [(replay.load(path).levelindex, None, path, None, args.pack) for path in args.replay]
+    else:
+        if args.pack:
+            import levelfile
+            count = len(levelfile.load(args.pack))
+        else:
+            count = len(levels.levellist)
+        jobs = [(i, seed, args.script, args.frames, args.pack)
+                for i in args.levels or range(count) for seed in range(args.seeds)]
+    sets = grid(axes)
+
+    start = time.perf_counter()
+    results = sweep(sets, jobs, args.processes)
+    took = time.perf_counter() - start
+    rows = table(results)
+    show(rows)
+    ticks = sum(result.ticks for result in results)
+    print(f"{len(results)} runs of {len(sets)} parameter sets in {took:.2f}s on "
+          f"{args.processes or os.cpu_count()} processes ({ticks / took:.0f} ticks/s)")
+    if args.csv:
+        with open(args.csv, "w", newline="") as file:
+            writer = csv.DictWriter(file, list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Many copies of a level stepped together, for training automated players
+
+    python vecenv.py 9 -n 2000 -t 200       # 2000 copies of level 9 on random actions, reports env steps/s
+
+    env = VecEnv(9, 2000)
+    obs = env.reset()                       # (n, OBSERVATION) float32
+    obs, rewards, dones = env.step(actions) # actions is n indexes into ACTIONS
+
+Every copy is a plain headless Level built from the level's factory, so they play exactly like the game.
+A copy that's cleared, dead or out of time (maxticks) starts over on its own during the same step,
+with a fresh seed, so the observation it returns is the first one of its next attempt.
+Needs numpy, like the swarm engine
+"""
+import os
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import argparse
+import heapq
+import time
+import zlib
+import levels
+from levels import TICK
+from solver import ACTIONS as MOVES, SHOOTING, frames_for
+
+ACTIONS = list(MOVES) + list(SHOOTING)  # shooting aims at the closest fish, it does nothing without the gun
+NEARBY = 4  # closest fish in every observation
+# x, y, vx, vy, oxygen (0 to 1), water level, can jump, has the gun, then dx, dy, width, height of every nearby fish
+OBSERVATION = 8 + NEARBY * 4
+CLEAR, DEATH = 1.0, -1.0  # rewards on top of how far right the player went that step (in screen widths)
+
+
+class VecEnv:
+    def __init__(self, levelindex, n, seed=0, repeat=1, maxticks=60 * levels.FPS, levellist=None):
+        if np is None:
+            raise ImportError("the vectorized environment needs numpy")
+        levellist = levels.levellist if levellist is None else levellist
+        self.n = n
+        self.seed = seed
+        self.repeat = repeat  # ticks every action is held for
+        self.maxticks = maxticks
+        factory = levellist.factories[levelindex]
+        self.levels = [factory() for i in range(n)]
+        self.episodes = [0] * n
+        self.ticks = np.zeros(n, dtype=np.int64)  # ticks into the current attempt of every copy
+        self.cleared = np.zeros(n, dtype=bool)  # whether the last attempt of every copy that ended was a clear
+        self.obs = np.zeros((n, OBSERVATION), dtype=np.float32)
+        self.rewards = np.zeros(n, dtype=np.float32)
+        self.dones = np.zeros(n, dtype=bool)
+        # the inputs of every action that doesn't aim at anything are always the same
+        self.frames = [None if name in SHOOTING else frames_for(None, name, repeat) for name in ACTIONS]
+
+    def restart(self, i):
+        level = self.levels[i]
+        level.reset()
+        level.reseed(zlib.crc32(f"{self.seed}/{i}/{self.episodes[i]}".encode()))
+        self.episodes[i] += 1
+        self.ticks[i] = 0
+
+    def reset(self):
+        for i in range(self.n):
+            self.restart(i)
+            self.observe(i)
+        return self.obs
+
+    def observe(self, i):
+        level = self.levels[i]
+        p = level.player
+        row = self.obs[i]
+        row[:8] = (p.topleft.x, p.topleft.y, p.v.x, p.v.y, p.oxygen / p.params.maxoxygen,
+                   level.waterlevel, p.can_jump, p.gun)
+        row[8:] = 0
+        x, y = p.topleft.x, p.topleft.y
+        closest = heapq.nsmallest(NEARBY, level.fish, key=lambda fish: (fish.topleft.x - x) ** 2 + (fish.topleft.y - y) ** 2)
+        for k, fish in enumerate(closest):
+            at = 8 + k * 4
+            row[at:at + 4] = (fish.topleft.x - x, fish.topleft.y - y, fish.width, fish.height)
+
+    def step(self, actions):
+        """Plays actions[i] (an index into ACTIONS) on copy i for repeat ticks,
+        returns the observations, the rewards and which copies ended (and started over)"""
+        for i, level in enumerate(self.levels):
+            player = level.player
+            start = player.topleft.x
+            frames = self.frames[actions[i]]
+            if frames is None:
+                name = ACTIONS[actions[i]]
+                frames = frames_for(level, name, self.repeat)
+                if frames[0].mousepos is None:
+                    frames = frames_for(level, name[len("shoot"):] or "wait", self.repeat)  # nothing to aim at
+            for frame in frames:
+                level.update(TICK, frame)
+                if level.cleared or not player.alive:
+                    break
+            self.ticks[i] += len(frames)
+            reward = (player.topleft.x - start) / level.screenwidth
+            done = level.cleared or not player.alive or self.ticks[i] >= self.maxticks
+            if done:
+                reward += CLEAR if level.cleared else DEATH if not player.alive else 0
+                self.cleared[i] = level.cleared
+                self.restart(i)
+            self.rewards[i] = reward
+            self.dones[i] = done
+            self.observe(i)
+        return self.obs, self.rewards, self.dones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step many copies of a level on random actions and report the speed")
+    parser.add_argument("level", type=int)
+    parser.add_argument("-n", "--envs", type=int, default=1000)
+    parser.add_argument("-t", "--steps", type=int, default=100)
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="ticks every action is held for")
+    parser.add_argument("--pack", metavar="PATH", help="a level of a level pack (see levelfile.py)")
+    args = parser.parse_args()
+    levellist = None
+    if args.pack:
+        import levelfile
+        levellist = levelfile.load(args.pack)
+
+    start = time.perf_counter()
+    env = VecEnv(args.level, args.envs, repeat=args.repeat, levellist=levellist)
+    env.reset()
+    built = time.perf_counter() - start
+    rng = np.random.default_rng(0)
+    ends = clears = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        obs, rewards, dones = env.step(rng.integers(len(ACTIONS), size=env.n))
+        ends += int(dones.sum())
+        clears += int((dones & env.cleared).sum())
+    took = time.perf_counter() - start
+    print(f"{env.n} envs built in {built:.2f}s, {args.steps} steps in {took:.2f}s "
+          f"({env.n * args.steps / took:.0f} env steps/s), {ends} attempts ended, {clears} cleared")
+
+
+if __name__ == "__main__":
+    main()